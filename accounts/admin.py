@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User, UserSettings, EmotionTag, ActivityTag, UserEmotionTag, UserActivityTag
+from .models import User, UserSettings, EmotionTag, ActivityTag, UserEmotionTag, UserActivityTag, ExportJob
 
 
 @admin.register(User)
@@ -61,3 +61,11 @@ class UserActivityTagAdmin(admin.ModelAdmin):
     list_display = ('user', 'activity', 'order')
     list_filter = ('activity',)
     search_fields = ('user__email', 'activity__name')
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ('user', 'archive_format', 'status', 'progress', 'created_at', 'expires_at')
+    list_filter = ('status', 'archive_format')
+    search_fields = ('user__email',)
+    readonly_fields = ('token', 'created_at', 'started_at', 'finished_at')
@@ -0,0 +1,19 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+User = get_user_model()
+
+
+class SettingsModelBackend(ModelBackend):
+    """Model backend that loads the user's settings in the same query.
+    
+    ``request.user`` is resolved through ``get_user`` once per request, so
+    every view reading ``request.user.settings`` gets it without another query.
+    """
+    
+    def get_user(self, user_id):
+        try:
+            user = User._default_manager.select_related('settings').get(pk=user_id)
+        except User.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
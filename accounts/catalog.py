@@ -0,0 +1,77 @@
+"""Process-local catalog of the emotion and activity tags.
+
+Both tag tables are small and change only through the admin or
+``setup_default_data``, so each process keeps them in memory as id -> tag
+maps. Saving or deleting a tag bumps a ``CacheGeneration`` row in the same
+transaction (see ``accounts.generations``); every process checks it on lookup
+and reloads when it has moved, which keeps all workers coherent without
+reloading the tables on each request.
+"""
+
+from .generations import bump_generation, get_generation as get_named_generation
+from .models import ActivityTag, EmotionTag
+
+GENERATION_KEY = 'accounts:tag-catalog'
+
+# (generation, TagCatalog) for this process
+_catalog = (None, None)
+
+
+class TagCatalog:
+    """Immutable snapshot of both tag tables, ordered by name."""
+    
+    def __init__(self):
+        self.emotions = {tag.id: tag for tag in EmotionTag.objects.all()}
+        self.activities = {tag.id: tag for tag in ActivityTag.objects.all()}
+    
+    def tags(self, field):
+        """Return the id -> tag map for ``'emotion'`` or ``'activity'``."""
+        return self.emotions if field == 'emotion' else self.activities
+    
+    def default_emotions(self):
+        return [tag for tag in self.emotions.values() if tag.is_default]
+    
+    def default_activities(self):
+        return [tag for tag in self.activities.values() if tag.is_default]
+    
+    def unknown_ids(self, field, tag_ids):
+        """Return the ids that do not belong to any tag of this type."""
+        return set(tag_ids) - self.tags(field).keys()
+    
+    def names(self, field, tag_ids):
+        tags = self.tags(field)
+        return [tags[tag_id].name for tag_id in tag_ids if tag_id in tags]
+    
+    def attach(self, links, field):
+        """Fill the ``emotion``/``activity`` FK of link rows from memory.
+        
+        Works for entry links and users' selected tags alike; returns the
+        rows as a list.
+        """
+        links = list(links)
+        tags = self.tags(field)
+        for link in links:
+            tag = tags.get(getattr(link, f'{field}_id'))
+            if tag is not None:
+                setattr(link, field, tag)
+        return links
+
+
+def get_generation():
+    return get_named_generation(GENERATION_KEY)
+
+
+def get_catalog():
+    """Return this process's catalog, reloading it if a tag has changed."""
+    global _catalog
+    generation = get_generation()
+    if _catalog[0] != generation:
+        _catalog = (generation, TagCatalog())
+    return _catalog[1]
+
+
+def invalidate_catalog():
+    """Make every process reload the catalog on its next lookup."""
+    global _catalog
+    _catalog = (None, None)
+    bump_generation(GENERATION_KEY)
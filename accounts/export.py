@@ -0,0 +1,213 @@
+"""Streaming serializers for the account data export.
+
+Entries are read with ``iterator(chunk_size=...)`` and their tag links are
+prefetched per chunk, with names resolved from the in-memory tag catalog. Each
+generator yields one small piece at a time, so an export holds at most one
+chunk of entries in memory however long the account's history is.
+
+``build_archive`` runs the same generators for background export jobs and
+packs their output, with the user's insights and report PDFs, into a zip or
+gzipped tarball on disk.
+"""
+
+import csv
+import json
+import tarfile
+import tempfile
+import time
+import zipfile
+
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.text import slugify
+
+from journal.models import JournalEntry
+from .catalog import get_catalog
+
+CHUNK_SIZE = 1000
+
+CSV_HEADER = ['Data Type', 'Date', 'Mood', 'Stress', 'Sleep Hours', 'Notes', 'Emotions', 'Activities']
+
+
+class Echo:
+    """File-like object whose ``write`` returns the value, for csv.writer."""
+    
+    def write(self, value):
+        return value
+
+
+def iter_entries(user, chunk_size=CHUNK_SIZE):
+    """Yield the user's entries as export dicts, one chunk in memory at a time."""
+    catalog = get_catalog()
+    entries = JournalEntry.with_tags(user.entries.all()).iterator(chunk_size=chunk_size)
+    for entry in entries:
+        yield {
+            'date': entry.date.isoformat(),
+            'mood_rating': entry.mood_rating,
+            'stress_level': entry.stress_level,
+            'sleep_hours': entry.sleep_hours,
+            'notes': entry.notes,
+            'emotions': catalog.names('emotion', [e.emotion_id for e in entry.emotions.all()]),
+            'activities': catalog.names('activity', [a.activity_id for a in entry.activities.all()]),
+        }
+
+
+def account_header(user):
+    """The user and settings sections of the JSON export."""
+    return {
+        'user': {
+            'email': user.email,
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+            'timezone': user.timezone,
+            'created_at': user.created_at.isoformat(),
+        },
+        'settings': {
+            'reminder_time': user.settings.reminder_time.isoformat(),
+            'reminder_enabled': user.settings.reminder_enabled,
+            'theme': user.settings.theme,
+        },
+    }
+
+
+def csv_rows(user, chunk_size=CHUNK_SIZE):
+    """Yield the CSV export line by line."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+    for entry in iter_entries(user, chunk_size):
+        yield writer.writerow([
+            'Journal Entry',
+            entry['date'],
+            entry['mood_rating'],
+            entry['stress_level'],
+            entry['sleep_hours'],
+            entry['notes'],
+            ', '.join(entry['emotions']),
+            ', '.join(entry['activities']),
+        ])
+
+
+def json_document(user, chunk_size=CHUNK_SIZE):
+    """Yield ``{"user": ..., "settings": ..., "entries": [...]}`` one entry at a time."""
+    header = json.dumps(account_header(user), indent=2)
+    # Reopen the header object to append the entries array
+    yield header[:-2] + ',\n  "entries": ['
+    for index, entry in enumerate(iter_entries(user, chunk_size)):
+        yield (',' if index else '') + '\n    ' + json.dumps(entry)
+    yield '\n  ]\n}\n'
+
+
+def ndjson_lines(user, chunk_size=CHUNK_SIZE):
+    """Yield one JSON entry object per line."""
+    for entry in iter_entries(user, chunk_size):
+        yield json.dumps(entry) + '\n'
+
+
+def insight_lines(user):
+    """Yield the user's generated insights as a JSON array, one per line."""
+    insights = user.insights.order_by('created_at').values(
+        'title', 'description', 'insight_type', 'data', 'start_date', 'end_date', 'created_at'
+    )
+    yield '['
+    for index, insight in enumerate(insights.iterator(chunk_size=CHUNK_SIZE)):
+        yield (',' if index else '') + '\n  ' + json.dumps(insight, cls=DjangoJSONEncoder)
+    yield '\n]\n'
+
+
+class ZipArchive:
+    """Archive writer that deflates each member straight into the zip."""
+    
+    def __init__(self, fileobj):
+        self.archive = zipfile.ZipFile(fileobj, 'w', compression=zipfile.ZIP_DEFLATED)
+    
+    def add(self, name, chunks):
+        with self.archive.open(name, 'w', force_zip64=True) as member:
+            for chunk in chunks:
+                member.write(chunk.encode() if isinstance(chunk, str) else chunk)
+    
+    def close(self):
+        self.archive.close()
+
+
+class TarArchive:
+    """Archive writer for tar.gz; members are spooled first since tar needs their size."""
+    
+    def __init__(self, fileobj):
+        self.archive = tarfile.open(fileobj=fileobj, mode='w:gz')
+    
+    def add(self, name, chunks):
+        with tempfile.TemporaryFile() as member:
+            for chunk in chunks:
+                member.write(chunk.encode() if isinstance(chunk, str) else chunk)
+            info = tarfile.TarInfo(name)
+            info.size = member.tell()
+            info.mtime = int(time.time())
+            member.seek(0)
+            self.archive.addfile(info, member)
+    
+    def close(self):
+        self.archive.close()
+
+
+ARCHIVE_WRITERS = {
+    'zip': ZipArchive,
+    'tar.gz': TarArchive,
+}
+
+
+def tracked(chunks, job, total, start, end):
+    """Pass chunks through, saving the job's progress every CHUNK_SIZE of them.
+    
+    The entry generators yield about one chunk per entry, so ``total`` entries
+    move progress from ``start`` to ``end`` percent.
+    """
+    for count, chunk in enumerate(chunks, 1):
+        if count % CHUNK_SIZE == 0:
+            job.set_progress(start + (end - start) * min(count, total) // total)
+        yield chunk
+    job.set_progress(end)
+
+
+def build_archive(job):
+    """Write the full export for ``job`` into an archive and attach it to the job.
+    
+    Contains entries.csv, entries.json, settings.json, insights.json and the
+    PDFs of the user's generated reports.
+    """
+    user = job.user
+    total = max(user.entries.count(), 1)
+    
+    with tempfile.TemporaryFile() as output:
+        archive = ARCHIVE_WRITERS[job.archive_format](output)
+        archive.add('entries.csv', tracked(csv_rows(user), job, total, 0, 40))
+        archive.add('entries.json', tracked(json_document(user), job, total, 40, 80))
+        archive.add('settings.json', [json.dumps(account_header(user), indent=2)])
+        archive.add('insights.json', tracked(insight_lines(user), job, total, 80, 90))
+        
+        # Copy report PDFs that are still in storage
+        for report in user.reports.exclude(pdf_file='').exclude(pdf_file__isnull=True):
+            try:
+                with report.pdf_file.open('rb') as pdf:
+                    archive.add(f'reports/{report.id}-{slugify(report.title)}.pdf', pdf.chunks())
+            except OSError:
+                continue
+            job.set_progress(job.progress)
+        archive.close()
+        
+        output.seek(0)
+        job.file.save(job.download_name, File(output), save=False)
+    
+    # A worker that lost its claim leaves the job to whoever holds it now
+    if not job.finish(status='done', progress=100, file=job.file.name,
+                      expires_at=timezone.now() + job.DOWNLOAD_TTL):
+        job.file.storage.delete(job.file.name)
+
+
+def run_job(job):
+    """Build the job's archive, recording any failure on the job instead of raising."""
+    try:
+        build_archive(job)
+    except Exception as e:
+        job.finish(status='failed', error=str(e))
+    return job
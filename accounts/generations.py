@@ -0,0 +1,44 @@
+"""Generation counters for shared data that processes keep in memory.
+
+Each counter is a ``CacheGeneration`` row, bumped in the same transaction as
+the write it announces, so every worker sees the new value once it commits.
+While a request is being served all counters are read in one query and
+reused until it finishes; outside requests (workers, commands) every check
+goes to the database.
+"""
+
+import threading
+
+from .models import CacheGeneration
+
+_local = threading.local()
+
+
+def begin_request():
+    """Start memoizing generations for the current request."""
+    _local.generations = None
+    _local.in_request = True
+
+
+def end_request():
+    _local.generations = None
+    _local.in_request = False
+
+
+def _load():
+    return dict(CacheGeneration.objects.values_list('name', 'value'))
+
+
+def get_generation(name):
+    """Return the generation of ``name``, 1 if it has never been bumped."""
+    if not getattr(_local, 'in_request', False):
+        return _load().get(name, 1)
+    if _local.generations is None:
+        _local.generations = _load()
+    return _local.generations.get(name, 1)
+
+
+def bump_generation(name):
+    """Increment ``name`` as part of the current transaction."""
+    CacheGeneration.bump(name)
+    _local.generations = None
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+from accounts.export import run_job
+from accounts.models import ExportJob
+
+
+class Command(BaseCommand):
+    help = 'Build pending data export archives and remove expired ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the queue once and exit instead of polling')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to wait between polls when idle')
+
+    def handle(self, *args, **options):
+        total_jobs = 0
+        while True:
+            requeued = ExportJob.requeue_stale()
+            if requeued:
+                self.stdout.write(f'Requeued {requeued} stale export jobs')
+            
+            purged = ExportJob.purge_expired()
+            if purged:
+                self.stdout.write(f'Removed {purged} expired exports')
+            
+            job = ExportJob.claim_next()
+            while job is not None:
+                run_job(job)
+                total_jobs += 1
+                self.stdout.write(f'{job.user.email}: {job.archive_format} export {job.status}')
+                job = ExportJob.claim_next()
+            
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+        
+        self.stdout.write(self.style.SUCCESS(f'Successfully processed {total_jobs} export jobs!'))
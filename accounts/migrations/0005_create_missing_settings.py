@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+def create_missing_settings(apps, schema_editor):
+    """Give accounts created before settings were made at signup their row."""
+    User = apps.get_model('accounts', 'User')
+    UserSettings = apps.get_model('accounts', 'UserSettings')
+    missing = User.objects.filter(settings__isnull=True).values_list('id', flat=True)
+    UserSettings.objects.bulk_create([UserSettings(user_id=user_id) for user_id in missing], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_user_data_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_missing_settings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-17 07:00
+
+import accounts.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_cache_generation'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exportjob',
+            name='file',
+            field=models.FileField(blank=True, null=True, storage=accounts.models.export_storage, upload_to=accounts.models.export_path),
+        ),
+    ]
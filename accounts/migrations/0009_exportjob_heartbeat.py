@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-17 07:01
+
+from django.db import migrations, models
+
+
+def seed_heartbeats(apps, schema_editor):
+    """Give jobs already running a heartbeat, so a dead worker's jobs still get requeued."""
+    ExportJob = apps.get_model('accounts', 'ExportJob')
+    ExportJob.objects.filter(status='running').update(heartbeat_at=models.F('started_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_private_export_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(seed_heartbeats, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,11 @@
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser, BaseUserManager
+from django.core.files.storage import FileSystemStorage
 from django.db import models
+from django.urls import reverse
 from django.utils import timezone
+from datetime import timedelta
+import uuid
 
 
 class UserManager(BaseUserManager):
@@ -36,6 +41,9 @@ class User(AbstractUser):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Bumped on every entry, tag or settings write; keys ETags and cached results
+    data_version = models.PositiveBigIntegerField(default=1)
+    
     # Keep username field for Django Allauth compatibility but make it non-unique
     username = models.CharField(max_length=150, blank=True, null=True)
     USERNAME_FIELD = 'email'
@@ -138,3 +146,153 @@ class UserActivityTag(models.Model):
     
     def __str__(self):
         return f"{self.user.email} - {self.activity.name}"
+
+
+def export_storage():
+    """Private storage for export archives; only ``ExportJobDownloadView`` serves them."""
+    return FileSystemStorage(location=settings.EXPORT_ROOT)
+
+
+def export_path(instance, filename):
+    """Store each archive under a random name that reveals nothing about its owner."""
+    return f"{uuid.uuid4().hex}.{instance.archive_format}"
+
+
+class ExportJob(models.Model):
+    """A background build of a user's full data archive."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    FORMAT_CHOICES = [
+        ('zip', 'ZIP archive'),
+        ('tar.gz', 'Gzipped tarball'),
+    ]
+    
+    # How long a finished archive can be downloaded
+    DOWNLOAD_TTL = timedelta(days=2)
+    
+    # A running job whose worker has not reported progress for this long is dead
+    STALE_AFTER = timedelta(minutes=15)
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='export_jobs')
+    token = models.UUIDField(default=uuid.uuid4, unique=True)
+    archive_format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default='zip')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    progress = models.PositiveSmallIntegerField(default=0)  # Percent
+    file = models.FileField(upload_to=export_path, storage=export_storage, null=True, blank=True)
+    error = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)  # Last progress report from the worker
+    finished_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='exportjob_status_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.email} - {self.archive_format} export ({self.status})"
+    
+    @property
+    def is_expired(self):
+        """Check if the download link has expired."""
+        return self.expires_at is not None and timezone.now() > self.expires_at
+    
+    @property
+    def download_name(self):
+        """File name offered to the owner when downloading; storage uses a random name."""
+        return f"journal_export_{self.created_at:%Y-%m-%d}.{self.archive_format}"
+    
+    def to_dict(self):
+        downloadable = self.status == 'done' and not self.is_expired
+        return {
+            'token': str(self.token),
+            'status': 'expired' if self.status == 'done' and self.is_expired else self.status,
+            'progress': self.progress,
+            'format': self.archive_format,
+            'error': self.error or None,
+            'created_at': self.created_at.isoformat(),
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+            'download_url': reverse('accounts:export_job_download', args=[self.token]) if downloadable else None,
+        }
+    
+    def set_progress(self, progress):
+        """Persist progress and the worker's heartbeat without touching the rest of the row."""
+        self.progress = progress
+        self.heartbeat_at = timezone.now()
+        ExportJob.objects.filter(pk=self.pk).update(progress=progress, heartbeat_at=self.heartbeat_at)
+    
+    def finish(self, **fields):
+        """Record the outcome if this worker still holds the claim; returns whether it did.
+        
+        A job requeued and claimed again by another worker has a new
+        ``started_at``, so a late original worker cannot overwrite its result.
+        """
+        fields['finished_at'] = timezone.now()
+        for name, value in fields.items():
+            setattr(self, name, value)
+        return bool(ExportJob.objects.filter(pk=self.pk, status='running', started_at=self.started_at).update(**fields))
+    
+    @classmethod
+    def claim_next(cls):
+        """Mark the oldest pending job as running and return it, or None.
+        
+        The status check in the UPDATE makes the claim safe with several
+        workers polling the same table.
+        """
+        for job in cls.objects.filter(status='pending').order_by('created_at')[:5]:
+            now = timezone.now()
+            if cls.objects.filter(pk=job.pk, status='pending').update(status='running', started_at=now, heartbeat_at=now):
+                job.status, job.started_at, job.heartbeat_at = 'running', now, now
+                return job
+        return None
+    
+    @classmethod
+    def in_progress(cls):
+        """Filter for jobs queued or being built by a live worker."""
+        return models.Q(status='pending') | models.Q(
+            status='running', heartbeat_at__gte=timezone.now() - cls.STALE_AFTER
+        )
+    
+    @classmethod
+    def requeue_stale(cls):
+        """Put jobs left running by a dead worker back in the queue."""
+        return cls.objects.filter(
+            status='running', heartbeat_at__lt=timezone.now() - cls.STALE_AFTER
+        ).update(status='pending', started_at=None, heartbeat_at=None, progress=0)
+    
+    @classmethod
+    def purge_expired(cls):
+        """Delete expired archives and their jobs; returns how many were removed."""
+        expired = list(cls.objects.filter(expires_at__lt=timezone.now()))
+        for job in expired:
+            if job.file:
+                job.file.delete(save=False)
+        cls.objects.filter(pk__in=[job.pk for job in expired]).delete()
+        return len(expired)
+
+
+class CacheGeneration(models.Model):
+    """A named counter bumped whenever shared, rarely-changing data is edited.
+    
+    Processes that keep such data in memory compare their copy's generation
+    with this row, so every worker sees an edit as soon as it commits.
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    value = models.PositiveBigIntegerField(default=1)
+    
+    def __str__(self):
+        return f"{self.name} (generation {self.value})"
+    
+    @classmethod
+    def bump(cls, name):
+        """Increment ``name`` as part of the current transaction."""
+        cls.objects.bulk_create([cls(name=name)], ignore_conflicts=True)
+        cls.objects.filter(pk=name).update(value=models.F('value') + 1)
@@ -0,0 +1,34 @@
+from django.core.signals import request_finished, request_started
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import generations
+from .catalog import invalidate_catalog
+from .models import ActivityTag, EmotionTag, User, UserSettings
+
+
+@receiver(post_save, sender=User)
+def create_user_settings(sender, instance, created, raw=False, **kwargs):
+    """Every account gets its settings row at signup, never lazily on a page view."""
+    if created and not raw:
+        UserSettings.objects.create(user=instance)
+
+
+@receiver(post_save, sender=EmotionTag)
+@receiver(post_delete, sender=EmotionTag)
+@receiver(post_save, sender=ActivityTag)
+@receiver(post_delete, sender=ActivityTag)
+def invalidate_tag_catalog(sender, **kwargs):
+    """Reload the in-memory tag catalog in every process after a tag change."""
+    invalidate_catalog()
+
+
+@receiver(request_started)
+def memoize_generations(sender, **kwargs):
+    """Read the shared generation counters at most once per request."""
+    generations.begin_request()
+
+
+@receiver(request_finished)
+def forget_generations(sender, **kwargs):
+    generations.end_request()
@@ -9,4 +9,7 @@ urlpatterns = [
     path('settings/update/', views.UpdateSettingsView.as_view(), name='update_settings'),
     path('delete-account/', views.DeleteAccountView.as_view(), name='delete_account'),
     path('export-data/', views.ExportDataView.as_view(), name='export_data'),
+    path('export-jobs/', views.ExportJobsView.as_view(), name='export_jobs'),
+    path('export-jobs/<uuid:token>/', views.ExportJobStatusView.as_view(), name='export_job_status'),
+    path('export-jobs/<uuid:token>/download/', views.ExportJobDownloadView.as_view(), name='export_job_download'),
 ]
@@ -1,14 +1,18 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from django.views.generic import TemplateView, View
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse, FileResponse
+from django.core.cache import cache
 from django.core import serializers
 from django.utils import timezone
 import json
-import csv
-from .models import UserSettings, EmotionTag, ActivityTag, UserEmotionTag, UserActivityTag
+from journal.caching import bump_data_version, versioned_key
+from journal.compression import CompressedResponseMixin
+from . import export
+from .catalog import get_catalog
+from .models import ExportJob, UserSettings, UserEmotionTag, UserActivityTag
 
 
 class ProfileView(LoginRequiredMixin, TemplateView):
@@ -24,15 +28,30 @@ class ProfileView(LoginRequiredMixin, TemplateView):
 class SettingsView(LoginRequiredMixin, TemplateView):
     """User settings view."""
     template_name = 'accounts/settings.html'
+    cache_timeout = 60 * 60
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         user = self.request.user
+        catalog = get_catalog()
+        # Loaded with the user by the auth backend
         context['settings'] = user.settings
-        context['emotion_tags'] = EmotionTag.objects.filter(is_default=True)
-        context['activity_tags'] = ActivityTag.objects.filter(is_default=True)
-        context['user_emotion_tags'] = user.emotion_tags.all()
-        context['user_activity_tags'] = user.activity_tags.all()
+        context['emotion_tags'] = catalog.default_emotions()
+        context['activity_tags'] = catalog.default_activities()
+        
+        # Selected tag ids are cached per data version, which every settings write bumps
+        cache_key = versioned_key(user, 'selected-tags')
+        selected = cache.get(cache_key)
+        if selected is None:
+            selected = {
+                'emotion': list(user.emotion_tags.values_list('emotion_id', flat=True)),
+                'activity': list(user.activity_tags.values_list('activity_id', flat=True)),
+            }
+            cache.set(cache_key, selected, self.cache_timeout)
+        
+        # Selected tags as tag objects, so the template can test membership
+        context['user_emotion_tags'] = [catalog.emotions[tag_id] for tag_id in selected['emotion'] if tag_id in catalog.emotions]
+        context['user_activity_tags'] = [catalog.activities[tag_id] for tag_id in selected['activity'] if tag_id in catalog.activities]
         return context
 
 
@@ -68,33 +87,27 @@ class UpdateSettingsView(LoginRequiredMixin, View):
             if 'share_link_duration_days' in data:
                 settings.share_link_duration_days = data['share_link_duration_days']
             
-            # Update emotion tags
+            # Update emotion tags, skipping ids that are not in the catalog
+            catalog = get_catalog()
             if 'emotions' in data:
-                from .models import UserEmotionTag
-                # Clear existing emotion tags
+                emotions = catalog.emotions
                 UserEmotionTag.objects.filter(user=request.user).delete()
-                # Add new emotion tags
-                for emotion_id in data['emotions']:
-                    try:
-                        emotion = EmotionTag.objects.get(id=emotion_id)
-                        UserEmotionTag.objects.create(user=request.user, emotion=emotion)
-                    except EmotionTag.DoesNotExist:
-                        pass
+                UserEmotionTag.objects.bulk_create([
+                    UserEmotionTag(user=request.user, emotion=emotions[emotion_id])
+                    for emotion_id in dict.fromkeys(map(int, data['emotions'])) if emotion_id in emotions
+                ])
             
             # Update activity tags
             if 'activities' in data:
-                from .models import UserActivityTag
-                # Clear existing activity tags
+                activities = catalog.activities
                 UserActivityTag.objects.filter(user=request.user).delete()
-                # Add new activity tags
-                for activity_id in data['activities']:
-                    try:
-                        activity = ActivityTag.objects.get(id=activity_id)
-                        UserActivityTag.objects.create(user=request.user, activity=activity)
-                    except ActivityTag.DoesNotExist:
-                        pass
+                UserActivityTag.objects.bulk_create([
+                    UserActivityTag(user=request.user, activity=activities[activity_id])
+                    for activity_id in dict.fromkeys(map(int, data['activities'])) if activity_id in activities
+                ])
             
             settings.save()
+            bump_data_version(request.user.id)
             
             return JsonResponse({'success': True, 'message': 'Settings updated successfully'})
             
@@ -116,68 +129,79 @@ class DeleteAccountView(LoginRequiredMixin, View):
             return redirect('accounts:settings')
 
 
-class ExportDataView(LoginRequiredMixin, View):
-    """Export user data in CSV format."""
+class ExportDataView(LoginRequiredMixin, CompressedResponseMixin, View):
+    """Export user data as CSV, JSON or NDJSON.
+    
+    All formats stream: entries are read in chunks and written out as they
+    arrive, so memory stays bounded for accounts with years of history.
+    """
+    formats = {
+        'csv': (export.csv_rows, 'text/csv'),
+        'json': (export.json_document, 'application/json'),
+        'ndjson': (export.ndjson_lines, 'application/x-ndjson'),
+    }
     
     def get(self, request):
         user = request.user
         format_type = request.GET.get('format', 'csv')
         
-        if format_type == 'csv':
-            response = HttpResponse(content_type='text/csv')
-            response['Content-Disposition'] = f'attachment; filename="{user.email}_data.csv"'
-            
-            writer = csv.writer(response)
-            writer.writerow(['Data Type', 'Date', 'Mood', 'Stress', 'Sleep Hours', 'Notes', 'Emotions', 'Activities'])
-            
-            # Export journal entries
-            for entry in user.entries.all():
-                emotions = ', '.join([e.emotion.name for e in entry.emotions.all()])
-                activities = ', '.join([a.activity.name for a in entry.activities.all()])
-                writer.writerow([
-                    'Journal Entry',
-                    entry.date,
-                    entry.mood_rating,
-                    entry.stress_level,
-                    entry.sleep_hours,
-                    entry.notes,
-                    emotions,
-                    activities
-                ])
-            
-            return response
+        if format_type not in self.formats:
+            return JsonResponse({'error': 'Invalid format'}, status=400)
         
-        elif format_type == 'json':
-            # Export as JSON
-            data = {
-                'user': {
-                    'email': user.email,
-                    'first_name': user.first_name,
-                    'last_name': user.last_name,
-                    'timezone': user.timezone,
-                    'created_at': user.created_at.isoformat(),
-                },
-                'settings': {
-                    'reminder_time': user.settings.reminder_time.isoformat(),
-                    'reminder_enabled': user.settings.reminder_enabled,
-                    'theme': user.settings.theme,
-                },
-                'entries': []
-            }
-            
-            for entry in user.entries.all():
-                data['entries'].append({
-                    'date': entry.date.isoformat(),
-                    'mood_rating': entry.mood_rating,
-                    'stress_level': entry.stress_level,
-                    'sleep_hours': entry.sleep_hours,
-                    'notes': entry.notes,
-                    'emotions': [e.emotion.name for e in entry.emotions.all()],
-                    'activities': [a.activity.name for a in entry.activities.all()],
-                })
-            
-            response = HttpResponse(json.dumps(data, indent=2), content_type='application/json')
-            response['Content-Disposition'] = f'attachment; filename="{user.email}_data.json"'
-            return response
+        serializer, content_type = self.formats[format_type]
+        response = StreamingHttpResponse(serializer(user), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{user.email}_data.{format_type}"'
+        return response
+
+
+class ExportJobsView(LoginRequiredMixin, View):
+    """Start a background archive export, or list recent ones.
+    
+    A user has at most one queued or running job per format; asking again
+    returns that job instead of queueing a duplicate. Jobs abandoned by a dead
+    worker do not count, so they never block a new export.
+    """
+    
+    def get(self, request):
+        jobs = request.user.export_jobs.all()[:10]
+        return JsonResponse({'jobs': [job.to_dict() for job in jobs]})
+    
+    def post(self, request):
+        archive_format = request.POST.get('format', 'zip')
+        if archive_format not in dict(ExportJob.FORMAT_CHOICES):
+            return JsonResponse({'success': False, 'error': 'Invalid format'}, status=400)
+        
+        try:
+            job = request.user.export_jobs.filter(
+                ExportJob.in_progress(), archive_format=archive_format
+            ).first()
+            if job is None:
+                job = ExportJob.objects.create(user=request.user, archive_format=archive_format)
+            return JsonResponse({'success': True, 'job': job.to_dict()})
+        except Exception as e:
+            return JsonResponse({'success': False, 'error': str(e)})
+
+
+class ExportJobStatusView(LoginRequiredMixin, View):
+    """Report the progress of an export job."""
+    
+    def get(self, request, token):
+        job = get_object_or_404(ExportJob, token=token, user=request.user)
+        return JsonResponse({'job': job.to_dict()})
+
+
+class ExportJobDownloadView(LoginRequiredMixin, View):
+    """Stream a finished export archive from storage."""
+    
+    def get(self, request, token):
+        job = get_object_or_404(ExportJob, token=token, user=request.user)
+        
+        if job.status != 'done' or not job.file:
+            return JsonResponse({'error': 'Export not ready'}, status=404)
+        
+        # Check if the download link has expired
+        if job.is_expired:
+            return JsonResponse({'error': 'Download link has expired'}, status=410)
         
-        return JsonResponse({'error': 'Invalid format'}, status=400)
+        content_type = 'application/zip' if job.archive_format == 'zip' else 'application/gzip'
+        return FileResponse(job.file.open('rb'), as_attachment=True, filename=job.download_name, content_type=content_type)
@@ -0,0 +1,14 @@
+"""Vectorized statistics shared by the insights and reports apps."""
+
+from .correlation import correlation_matrix, pearson, rankdata, spearman
+from .series import rolling_mean, slope, volatility
+
+__all__ = [
+    'correlation_matrix',
+    'pearson',
+    'rankdata',
+    'rolling_mean',
+    'slope',
+    'spearman',
+    'volatility',
+]
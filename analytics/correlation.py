@@ -0,0 +1,83 @@
+"""Pearson and Spearman correlation over NumPy arrays with missing values.
+
+Missing values are NaN. Every pair of series uses only the positions where
+both are present (pairwise-complete), and undefined results - fewer than two
+points or a constant series - come back as NaN.
+"""
+
+import numpy as np
+
+# Variances this close to zero (relative to the sum of squares) are rounding noise
+TOLERANCE = 1e-9
+
+
+def _complete(x, y):
+    """Return x and y as float arrays restricted to positions where both are present."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    both = ~(np.isnan(x) | np.isnan(y))
+    return x[both], y[both]
+
+
+def pearson(x, y):
+    """Pearson correlation of two equal-length series."""
+    x, y = _complete(x, y)
+    if len(x) < 2:
+        return np.nan
+    dx = x - x.mean()
+    dy = y - y.mean()
+    denominator = np.sqrt((dx @ dx) * (dy @ dy))
+    if denominator == 0:
+        return np.nan
+    return float(np.clip((dx @ dy) / denominator, -1.0, 1.0))
+
+
+def rankdata(values):
+    """Ranks starting at 1, with ties given the average of their ranks."""
+    values = np.asarray(values, dtype=float)
+    order = np.argsort(values, kind='mergesort')
+    ordered = values[order]
+    
+    # Start of every run of equal values, plus the end
+    bounds = np.flatnonzero(np.r_[True, ordered[1:] != ordered[:-1], True])
+    average = (bounds[:-1] + bounds[1:] + 1) / 2
+    
+    ranks = np.empty(len(values))
+    ranks[order] = np.repeat(average, np.diff(bounds))
+    return ranks
+
+
+def spearman(x, y):
+    """Spearman rank correlation of two equal-length series."""
+    x, y = _complete(x, y)
+    if len(x) < 2:
+        return np.nan
+    return pearson(rankdata(x), rankdata(y))
+
+
+def correlation_matrix(values):
+    """Return ``(r, n)`` for a 2-D array with a column per series.
+    
+    ``r[i, j]`` is the Pearson correlation of columns i and j over the rows
+    where both are present, and ``n[i, j]`` the number of those rows. All
+    pairs come out of a few matrix products instead of one pass per pair.
+    """
+    values = np.asarray(values, dtype=float)
+    present = ~np.isnan(values)
+    mask = present.astype(float)
+    filled = np.where(present, values, 0.0)
+    
+    # n[i, j]: rows with both; sums[i, j]: sum of column i over those rows
+    n = mask.T @ mask
+    sums = filled.T @ mask
+    squares = (filled ** 2).T @ mask
+    products = filled.T @ filled
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = products - sums * sums.T / n
+        var = squares - sums ** 2 / n
+        var[var <= TOLERANCE * np.maximum(squares, 1)] = 0
+        r = cov / np.sqrt(var * var.T)
+    
+    r[(n < 2) | ~np.isfinite(r)] = np.nan
+    return np.clip(r, -1.0, 1.0), n.astype(int)
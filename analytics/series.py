@@ -0,0 +1,55 @@
+"""Trend and smoothing statistics for a single series of observations.
+
+Series are NumPy arrays (or anything ``np.asarray`` accepts) in time order,
+with NaN for missing values.
+"""
+
+import numpy as np
+
+
+def slope(values, x=None):
+    """Least-squares slope of ``values`` against ``x`` (positions 0, 1, 2... by default)."""
+    y = np.asarray(values, dtype=float)
+    x = np.arange(len(y), dtype=float) if x is None else np.asarray(x, dtype=float)
+    both = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[both], y[both]
+    if len(x) < 2:
+        return np.nan
+    dx = x - x.mean()
+    spread = dx @ dx
+    if spread == 0:
+        return np.nan
+    return float(dx @ (y - y.mean()) / spread)
+
+
+def rolling_mean(values, window):
+    """Trailing mean over ``window`` positions, skipping missing values.
+    
+    The result has one value per input position; positions before the first
+    full window, or whose window holds no values, are NaN.
+    """
+    values = np.asarray(values, dtype=float)
+    present = ~np.isnan(values)
+    sums = np.cumsum(np.where(present, values, 0.0))
+    counts = np.cumsum(present)
+    sums[window:] = sums[window:] - sums[:-window]
+    counts[window:] = counts[window:] - counts[:-window]
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = sums / counts
+    means[counts == 0] = np.nan
+    means[:window - 1] = np.nan
+    return means
+
+
+def volatility(values):
+    """Standard deviation of the changes between consecutive observations.
+    
+    Missing values are dropped first, so a gap compares the values on either
+    side of it. Returns NaN below two observations.
+    """
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if len(values) < 2:
+        return np.nan
+    return float(np.diff(values).std())
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""
+Microbenchmarks for the shared analytics module.
+Compares it with the pure-Python trend and correlation code it replaced,
+on series of 10 to 100,000 points.
+Run with: python bench_analytics.py
+"""
+
+import os
+import sys
+import timeit
+
+import numpy as np
+
+# Add the project directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from analytics import pearson, rolling_mean, slope, spearman, volatility
+
+SIZES = [10, 100, 1_000, 10_000, 100_000]
+
+
+def legacy_trend(values):
+    """The pure-Python regression formerly in the insights and reports views."""
+    if len(values) < 2:
+        return 0
+    
+    x = list(range(len(values)))
+    n = len(values)
+    
+    sum_x = sum(x)
+    sum_y = sum(values)
+    sum_xy = sum(x[i] * values[i] for i in range(n))
+    sum_x2 = sum(x[i] ** 2 for i in range(n))
+    
+    return (n * sum_xy - sum_x * sum_y) / (n * sum_x2 - sum_x ** 2)
+
+
+def legacy_correlation(x, y):
+    """The pure-Python Pearson coefficient formerly in the insights view."""
+    if len(x) != len(y) or len(x) < 2:
+        return 0
+    
+    n = len(x)
+    sum_x = sum(x)
+    sum_y = sum(y)
+    sum_xy = sum(x[i] * y[i] for i in range(n))
+    sum_x2 = sum(x[i] ** 2 for i in range(n))
+    sum_y2 = sum(y[i] ** 2 for i in range(n))
+    
+    numerator = n * sum_xy - sum_x * sum_y
+    denominator = ((n * sum_x2 - sum_x ** 2) * (n * sum_y2 - sum_y ** 2)) ** 0.5
+    
+    if denominator == 0:
+        return 0
+    
+    return numerator / denominator
+
+
+def best_time(func):
+    """Best per-call time in seconds over five timing runs."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=5, number=number)) / number
+
+
+def format_time(seconds):
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f'{seconds / scale:.2f} {unit}'
+    return f'{seconds / 1e-9:.0f} ns'
+
+
+def run_benchmarks():
+    """Print one table row per statistic and series size."""
+    rng = np.random.default_rng(0)
+    print(f"{'statistic':<12}{'points':>10}{'legacy':>14}{'analytics':>14}{'speedup':>10}")
+    
+    for size in SIZES:
+        mood = rng.integers(1, 11, size).astype(float)
+        sleep = rng.normal(7, 1, size)
+        # The legacy code took Python lists, so converting is part of its cost
+        cases = [
+            ('slope', lambda: legacy_trend(mood.tolist()), lambda: slope(mood)),
+            ('pearson', lambda: legacy_correlation(mood.tolist(), sleep.tolist()), lambda: pearson(mood, sleep)),
+            ('spearman', None, lambda: spearman(mood, sleep)),
+            ('rolling', None, lambda: rolling_mean(mood, 7)),
+            ('volatility', None, lambda: volatility(mood)),
+        ]
+        for name, legacy, current in cases:
+            current_time = best_time(current)
+            if legacy is None:
+                print(f"{name:<12}{size:>10}{'-':>14}{format_time(current_time):>14}{'-':>10}")
+                continue
+            legacy_time = best_time(legacy)
+            print(f"{name:<12}{size:>10}{format_time(legacy_time):>14}{format_time(current_time):>14}{legacy_time / current_time:>9.1f}x")
+
+
+if __name__ == '__main__':
+    run_benchmarks()
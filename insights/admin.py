@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Insight, Correlation
+from .models import Insight, Correlation, InsightJob
 
 
 @admin.register(Insight)
@@ -16,3 +16,11 @@ class CorrelationAdmin(admin.ModelAdmin):
     list_filter = ('metric1', 'metric2', 'created_at')
     search_fields = ('user__email',)
     date_hierarchy = 'created_at'
+
+
+@admin.register(InsightJob)
+class InsightJobAdmin(admin.ModelAdmin):
+    list_display = ('user', 'days', 'status', 'insight_count', 'created_at', 'finished_at')
+    list_filter = ('status', 'days')
+    search_fields = ('user__email',)
+    readonly_fields = ('created_at', 'started_at', 'finished_at')
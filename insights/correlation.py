@@ -0,0 +1,37 @@
+"""Vectorized pairwise correlations over a matrix of daily metrics.
+
+Rows are observations and columns are metrics, with missing values as NaN.
+Every pair uses only the rows where both of its metrics are present
+(pairwise-complete), and all pairs come from ``analytics.correlation_matrix``.
+"""
+
+import numpy as np
+
+from django.db.models import Count
+
+from analytics import correlation_matrix
+
+METRICS = ['mood_rating', 'stress_level', 'sleep_hours', 'emotion_count', 'activity_count']
+
+
+def metric_rows(entries):
+    """Return ``(date, mood, stress, sleep, emotion count, activity count)`` per entry in one query."""
+    return list(
+        entries.annotate(
+            emotion_count=Count('emotions', distinct=True),
+            activity_count=Count('activities', distinct=True),
+        ).values_list('date', *METRICS)
+    )
+
+
+def pairwise_correlations(values, metrics=METRICS):
+    """Correlations keyed ``"<a>_vs_<b>"``, once per unordered pair of metrics."""
+    r, n = correlation_matrix(values)
+    correlations = {}
+    for i, j in zip(*np.triu_indices(len(metrics), k=1)):
+        if not np.isnan(r[i, j]):
+            correlations[f"{metrics[i]}_vs_{metrics[j]}"] = {
+                'correlation': round(float(r[i, j]), 3),
+                'sample_size': int(n[i, j]),
+            }
+    return correlations
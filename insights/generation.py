@@ -0,0 +1,207 @@
+"""Insight generation, run by the ``run_insight_jobs`` worker.
+
+Requests only enqueue an ``InsightJob``; the worker loads the window's entries
+with their tag links prefetched, derives the insights and stores them.
+"""
+
+from collections import Counter
+from datetime import timedelta
+
+import numpy as np
+from django.utils import timezone
+
+from accounts.catalog import get_catalog
+from analytics import pearson, slope
+from journal.models import JournalEntry
+from .models import Insight
+
+
+def run_job(job):
+    """Generate the insights for a claimed job, recording the outcome on it."""
+    try:
+        end_date = timezone.now().date()
+        start_date = end_date - timedelta(days=job.days)
+        insights = generate_insights(job.user, job.days, start_date, end_date)
+        job.status = 'done'
+        job.insight_count = len(insights)
+    except Exception as e:
+        job.status = 'failed'
+        job.error = str(e)
+    job.finished_at = timezone.now()
+    job.save()
+    return job
+
+
+def generate_insights(user, window_days, start_date, end_date):
+    """Generate and store insights for the user's entries since ``start_date``."""
+    entries = list(JournalEntry.with_tags(user.entries.filter(date__gte=start_date).order_by('date')))
+    insights = []
+    
+    # Calculate basic statistics
+    mood_ratings = [e.mood_rating for e in entries if e.mood_rating is not None]
+    stress_levels = [e.stress_level for e in entries if e.stress_level is not None]
+    sleep_hours = [e.sleep_hours for e in entries if e.sleep_hours is not None]
+    
+    # Entry-aligned series with NaN where a value is missing, for correlations
+    mood_series = np.array([e.mood_rating for e in entries], dtype=float)
+    stress_series = np.array([e.stress_level for e in entries], dtype=float)
+    sleep_series = np.array([e.sleep_hours for e in entries], dtype=float)
+    
+    # Basic mood insights (works with any number of entries)
+    if mood_ratings:
+        avg_mood = sum(mood_ratings) / len(mood_ratings)
+        min_mood = min(mood_ratings)
+        max_mood = max(mood_ratings)
+        
+        # Mood summary insight
+        mood_description = f"Your average mood over {len(entries)} entries is {avg_mood:.1f}/10"
+        if len(mood_ratings) > 1:
+            mood_range = max_mood - min_mood
+            if mood_range > 3:
+                mood_description += f". You've experienced a wide range of moods ({min_mood}-{max_mood}), which is normal for mental health tracking."
+            else:
+                mood_description += f". Your mood has been relatively stable ({min_mood}-{max_mood})."
+        
+        insights.append({
+            'kind': 'mood_summary',
+            'title': 'Mood Summary',
+            'description': mood_description,
+            'type': 'summary',
+            'data': {'avg_mood': round(avg_mood, 2), 'min_mood': min_mood, 'max_mood': max_mood, 'entries': len(entries)}
+        })
+        
+        # Mood trend insight (only if we have enough data)
+        if len(mood_ratings) >= 3:
+            mood_trend = slope(mood_ratings)
+            if mood_trend > 0.1:
+                insights.append({
+                    'kind': 'mood_trend',
+                    'title': 'Positive Mood Trend',
+                    'description': f'Your mood has been improving over the last {len(entries)} days!',
+                    'type': 'trend',
+                    'data': {'trend': mood_trend, 'avg_mood': round(avg_mood, 2)}
+                })
+            elif mood_trend < -0.1:
+                insights.append({
+                    'kind': 'mood_trend',
+                    'title': 'Mood Decline Detected',
+                    'description': f'Your mood has been declining over the last {len(entries)} days. Consider reaching out for support.',
+                    'type': 'trend',
+                    'data': {'trend': mood_trend, 'avg_mood': round(avg_mood, 2)}
+                })
+    
+    # Sleep insights
+    if sleep_hours:
+        avg_sleep = sum(sleep_hours) / len(sleep_hours)
+        sleep_description = f"Your average sleep is {avg_sleep:.1f} hours per night"
+        if avg_sleep < 7:
+            sleep_description += ". Consider aiming for 7-9 hours for better mental health."
+        elif avg_sleep > 9:
+            sleep_description += ". You're getting plenty of sleep!"
+        else:
+            sleep_description += ". This is a healthy amount of sleep."
+        
+        insights.append({
+            'kind': 'sleep_summary',
+            'title': 'Sleep Analysis',
+            'description': sleep_description,
+            'type': 'summary',
+            'data': {'avg_sleep': round(avg_sleep, 2), 'entries': len(sleep_hours)}
+        })
+    
+    # Stress insights
+    if stress_levels:
+        avg_stress = sum(stress_levels) / len(stress_levels)
+        stress_description = f"Your average stress level is {avg_stress:.1f}/10"
+        if avg_stress > 7:
+            stress_description += ". Consider stress management techniques like deep breathing or meditation."
+        elif avg_stress < 4:
+            stress_description += ". You're managing stress well!"
+        else:
+            stress_description += ". This is a moderate stress level."
+        
+        insights.append({
+            'kind': 'stress_summary',
+            'title': 'Stress Analysis',
+            'description': stress_description,
+            'type': 'summary',
+            'data': {'avg_stress': round(avg_stress, 2), 'entries': len(stress_levels)}
+        })
+    
+    # Correlations (only if we have enough data)
+    if len(entries) >= 3:
+        # Sleep and mood correlation
+        if sleep_hours and mood_ratings and len(sleep_hours) >= 2:
+            sleep_mood_corr = pearson(sleep_series, mood_series)
+            if abs(sleep_mood_corr) > 0.2:  # Lower threshold for fewer data points
+                insights.append({
+                    'kind': 'sleep_mood_correlation',
+                    'title': 'Sleep-Mood Connection',
+                    'description': f'There\'s a {"positive" if sleep_mood_corr > 0 else "negative"} correlation between your sleep and mood.',
+                    'type': 'correlation',
+                    'data': {'correlation': round(sleep_mood_corr, 3)}
+                })
+        
+        # Stress and mood correlation
+        if stress_levels and mood_ratings and len(stress_levels) >= 2:
+            stress_mood_corr = pearson(stress_series, mood_series)
+            if abs(stress_mood_corr) > 0.2:  # Lower threshold for fewer data points
+                insights.append({
+                    'kind': 'stress_mood_correlation',
+                    'title': 'Stress-Mood Connection',
+                    'description': f'There\'s a {"negative" if stress_mood_corr < 0 else "positive"} correlation between your stress and mood.',
+                    'type': 'correlation',
+                    'data': {'correlation': round(stress_mood_corr, 3)}
+                })
+    
+    # Activity insights
+    insights.extend(generate_activity_insights(entries))
+    
+    # Replace the window's previous insights in one transaction
+    Insight.supersede(user, window_days, start_date, end_date, insights)
+    
+    return insights
+
+
+def generate_activity_insights(entries):
+    """Generate insights about activities and emotions from prefetched entries."""
+    insights = []
+    catalog = get_catalog()
+    
+    # Count activities and emotions across all entries
+    activity_counts = Counter(
+        name for entry in entries
+        for name in catalog.names('activity', [link.activity_id for link in entry.activities.all()])
+    )
+    emotion_counts = Counter(
+        name for entry in entries
+        for name in catalog.names('emotion', [link.emotion_id for link in entry.emotions.all()])
+    )
+    
+    # Activity insights
+    if activity_counts:
+        most_common_activity = max(activity_counts, key=activity_counts.get)
+        total_activities = sum(activity_counts.values())
+        
+        insights.append({
+            'kind': 'top_activity',
+            'title': 'Most Common Activity',
+            'description': f'You\'ve logged "{most_common_activity}" {activity_counts[most_common_activity]} times. This seems to be an important part of your routine.',
+            'type': 'pattern',
+            'data': {'activity': most_common_activity, 'count': activity_counts[most_common_activity], 'total': total_activities}
+        })
+    
+    # Emotion insights
+    if emotion_counts:
+        most_common_emotion = max(emotion_counts, key=emotion_counts.get)
+        total_emotions = sum(emotion_counts.values())
+        
+        insights.append({
+            'kind': 'top_emotion',
+            'title': 'Most Common Emotion',
+            'description': f'You\'ve logged "{most_common_emotion}" {emotion_counts[most_common_emotion]} times. This gives insight into your emotional patterns.',
+            'type': 'pattern',
+            'data': {'emotion': most_common_emotion, 'count': emotion_counts[most_common_emotion], 'total': total_emotions}
+        })
+    
+    return insights
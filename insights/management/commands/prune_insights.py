@@ -0,0 +1,16 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from insights.models import Insight
+
+
+class Command(BaseCommand):
+    help = 'Delete superseded (inactive) insights past the retention period, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=Insight.RETENTION.days, help='Keep inactive insights touched within this many days')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows deleted per statement')
+
+    def handle(self, *args, **options):
+        total = Insight.prune_superseded(timedelta(days=options['days']), options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Successfully pruned {total} superseded insights!'))
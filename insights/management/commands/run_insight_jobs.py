@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+from insights.generation import run_job
+from insights.models import InsightJob
+
+
+class Command(BaseCommand):
+    help = 'Generate insights for queued jobs, polling the database for new ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the queue once and exit instead of polling')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds to wait between polls when idle')
+
+    def handle(self, *args, **options):
+        total_jobs = 0
+        while True:
+            requeued = InsightJob.requeue_stale()
+            if requeued:
+                self.stdout.write(f'Requeued {requeued} stale insight jobs')
+            
+            job = InsightJob.claim_next()
+            while job is not None:
+                run_job(job)
+                total_jobs += 1
+                self.stdout.write(f'{job.user.email}: {job.days}-day insights {job.status} ({job.insight_count} insights)')
+                job = InsightJob.claim_next()
+            
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+        
+        self.stdout.write(self.style.SUCCESS(f'Successfully processed {total_jobs} insight jobs!'))
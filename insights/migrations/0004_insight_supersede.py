@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-17 06:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insights', '0003_insight_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='insight',
+            name='kind',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='insight',
+            name='window_days',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='insight',
+            index=models.Index(fields=['user', 'window_days', 'is_active', 'updated_at'], name='insight_user_window_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='insight',
+            index=models.Index(fields=['is_active', 'updated_at'], name='insight_active_updated_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='insight',
+            constraint=models.UniqueConstraint(fields=('user', 'kind', 'window_days'), name='insight_one_per_kind_window'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+from django.db import migrations
+
+KINDS = {
+    'Mood Summary': 'mood_summary',
+    'Positive Mood Trend': 'mood_trend',
+    'Mood Decline Detected': 'mood_trend',
+    'Sleep Analysis': 'sleep_summary',
+    'Stress Analysis': 'stress_summary',
+    'Sleep-Mood Connection': 'sleep_mood_correlation',
+    'Stress-Mood Connection': 'stress_mood_correlation',
+    'Most Common Activity': 'top_activity',
+    'Most Common Emotion': 'top_emotion',
+}
+
+
+def key_existing_insights(apps, schema_editor):
+    """Key the newest insight of each kind and window; retire the older copies."""
+    Insight = apps.get_model('insights', 'Insight')
+    rows = Insight.objects.filter(window_days__isnull=True).order_by('-created_at', '-id').values_list(
+        'id', 'user_id', 'title', 'start_date', 'end_date'
+    )
+    seen = set()
+    keyed = []
+    retired = []
+    for insight_id, user_id, title, start_date, end_date in rows.iterator(chunk_size=2000):
+        kind = KINDS.get(title)
+        key = (user_id, kind, (end_date - start_date).days)
+        if kind is None or key in seen:
+            retired.append(insight_id)
+            continue
+        seen.add(key)
+        keyed.append(Insight(id=insight_id, kind=kind, window_days=key[2]))
+    
+    Insight.objects.bulk_update(keyed, ['kind', 'window_days'], batch_size=500)
+    for start in range(0, len(retired), 500):
+        Insight.objects.filter(id__in=retired[start:start + 500]).update(is_active=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insights', '0004_insight_supersede'),
+    ]
+
+    operations = [
+        migrations.RunPython(key_existing_insights, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+from django.db import migrations
+
+
+def clear_window_correlations(apps, schema_editor):
+    """Drop the per-day window rows the insights page used to store; it now computes them on read."""
+    apps.get_model('insights', 'Correlation').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insights', '0005_backfill_insight_kinds'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_window_correlations, migrations.RunPython.noop),
+    ]
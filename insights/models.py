@@ -1,15 +1,27 @@
-from django.db import models
+from django.db import IntegrityError, connection, models, transaction
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+from datetime import timedelta
+from journal.models import MetricPrefix
 
 User = get_user_model()
 
 
 class Insight(models.Model):
-    """Generated insights and correlations for users."""
+    """Generated insights and correlations for users.
+    
+    Each generation run upserts one row per (user, kind, window_days), so
+    regenerating a window rewrites its insights in place. Kinds a run no
+    longer produces are deactivated, and ``prune_superseded`` removes them
+    once they are past the retention period.
+    """
+    # How long deactivated insights are kept before pruning
+    RETENTION = timedelta(days=30)
+    
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='insights')
     
     # Insight metadata
+    kind = models.CharField(max_length=50, blank=True)  # e.g., 'mood_trend', 'sleep_summary'
     title = models.CharField(max_length=200)
     description = models.TextField()
     insight_type = models.CharField(max_length=50, choices=[
@@ -23,6 +35,7 @@ class Insight(models.Model):
     data = models.JSONField(default=dict)  # Store charts data, correlations, etc.
     
     # Time range this insight covers
+    window_days = models.PositiveIntegerField(null=True, blank=True)
     start_date = models.DateField()
     end_date = models.DateField()
     
@@ -35,13 +48,76 @@ class Insight(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'window_days', 'is_active', 'updated_at'], name='insight_user_window_idx'),
+            models.Index(fields=['is_active', 'updated_at'], name='insight_active_updated_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'kind', 'window_days'], name='insight_one_per_kind_window'),
+        ]
     
     def __str__(self):
         return f"{self.user.email} - {self.title}"
+    
+    @classmethod
+    def supersede(cls, user, window_days, start_date, end_date, generated):
+        """Store a generation run's insights as the current ones for the window.
+        
+        One upsert writes every insight and one UPDATE deactivates the kinds
+        this run did not produce, both in a single transaction.
+        """
+        rows = [
+            cls(
+                user=user,
+                kind=insight['kind'],
+                title=insight['title'],
+                description=insight['description'],
+                insight_type=insight['type'],
+                data=insight['data'],
+                window_days=window_days,
+                start_date=start_date,
+                end_date=end_date,
+                is_active=True,
+            )
+            for insight in generated
+        ]
+        with transaction.atomic():
+            cls.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['user', 'kind', 'window_days'],
+                update_fields=['title', 'description', 'insight_type', 'data', 'start_date', 'end_date', 'is_active', 'updated_at'],
+            )
+            cls.objects.filter(user=user, window_days=window_days, is_active=True).exclude(
+                kind__in=[row.kind for row in rows]
+            ).update(is_active=False, updated_at=timezone.now())
+        return rows
+    
+    @classmethod
+    def prune_superseded(cls, older_than=None, batch_size=1000):
+        """Delete inactive insights not touched for ``older_than``, in batches.
+        
+        Returns how many rows were removed. Short batches keep each DELETE's
+        locks brief on a busy table.
+        """
+        cutoff = timezone.now() - (older_than or cls.RETENTION)
+        stale = cls.objects.filter(is_active=False, updated_at__lt=cutoff).order_by().values_list('id', flat=True)
+        total = 0
+        while True:
+            ids = list(stale[:batch_size])
+            if not ids:
+                return total
+            total += cls.objects.filter(id__in=ids).delete()[0]
 
 
 class Correlation(models.Model):
     """Stored correlation calculations between different metrics."""
+    PAIRS = [
+        ('mood_rating', 'stress_level'),
+        ('mood_rating', 'sleep_hours'),
+        ('stress_level', 'sleep_hours'),
+    ]
+    
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='correlations')
     
     # What we're correlating
@@ -66,3 +142,124 @@ class Correlation(models.Model):
     
     def __str__(self):
         return f"{self.user.email} - {self.metric1} vs {self.metric2}: {self.correlation_coefficient:.3f}"
+    
+    @classmethod
+    def for_window(cls, user, start_date, end_date):
+        """Compute the window's correlations from the prefix store, strongest first.
+        
+        Reads two prefix rows however long the window is and returns unsaved
+        instances, so showing a window never writes. Pairs without enough
+        variance are left out.
+        """
+        window = MetricPrefix.window(user, start_date, end_date)
+        rows = []
+        for metric1, metric2 in cls.PAIRS:
+            coefficient = window.correlation(metric1, metric2)
+            if coefficient is None:
+                continue
+            rows.append(cls(
+                user=user,
+                metric1=metric1,
+                metric2=metric2,
+                correlation_coefficient=round(coefficient, 3),
+                sample_size=window.count(metric1, metric2),
+                start_date=start_date,
+                end_date=end_date,
+            ))
+        return sorted(rows, key=lambda row: abs(row.correlation_coefficient), reverse=True)
+
+
+class InsightJob(models.Model):
+    """A queued run of insight generation for one user and window."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    ACTIVE = ['pending', 'running']
+    
+    # Running jobs older than this are assumed to belong to a dead worker
+    STALE_AFTER = timedelta(minutes=15)
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='insight_jobs')
+    days = models.PositiveIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    insight_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='insightjob_status_created_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'days'],
+                condition=models.Q(status__in=['pending', 'running']),
+                name='insightjob_one_active_per_window',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.email} - {self.days} days ({self.status})"
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'days': self.days,
+            'status': self.status,
+            'insight_count': self.insight_count,
+            'error': self.error or None,
+            'created_at': self.created_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+    
+    @classmethod
+    def enqueue(cls, user, days):
+        """Queue generation for a window, or return the job already queued for it."""
+        active = cls.objects.filter(user=user, days=days, status__in=cls.ACTIVE)
+        job = active.first()
+        if job is not None:
+            return job
+        try:
+            with transaction.atomic():
+                return cls.objects.create(user=user, days=days)
+        except IntegrityError:
+            # Another request queued the same window first
+            return active.get()
+    
+    @classmethod
+    def claim_next(cls):
+        """Mark the oldest pending job as running and return it, or None.
+        
+        Postgres locks the row with SKIP LOCKED so concurrent workers pass over
+        each other's claims. Elsewhere the status check in a conditional UPDATE
+        does the same job.
+        """
+        if connection.features.has_select_for_update_skip_locked:
+            with transaction.atomic():
+                job = cls.objects.select_for_update(skip_locked=True).filter(status='pending').order_by('created_at').first()
+                if job is None:
+                    return None
+                job.status, job.started_at = 'running', timezone.now()
+                job.save(update_fields=['status', 'started_at'])
+                return job
+        
+        for job in cls.objects.filter(status='pending').order_by('created_at')[:5]:
+            now = timezone.now()
+            if cls.objects.filter(pk=job.pk, status='pending').update(status='running', started_at=now):
+                job.status, job.started_at = 'running', now
+                return job
+        return None
+    
+    @classmethod
+    def requeue_stale(cls):
+        """Put jobs left running by a dead worker back in the queue."""
+        return cls.objects.filter(
+            status='running', started_at__lt=timezone.now() - cls.STALE_AFTER
+        ).update(status='pending', started_at=None)
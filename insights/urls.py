@@ -7,4 +7,5 @@ urlpatterns = [
     path('', views.InsightsView.as_view(), name='insights'),
     path('api/correlations/', views.CorrelationsAPIView.as_view(), name='correlations_api'),
     path('api/generate/', views.GenerateInsightsView.as_view(), name='generate_insights'),
+    path('api/jobs/<int:job_id>/', views.InsightJobStatusView.as_view(), name='insight_job_status'),
 ]
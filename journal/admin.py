@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import JournalEntry, EntryEmotion, EntryActivity, DailyPrompt, ReminderLog
+from .models import JournalEntry, DailySummary, MetricPrefix, DeletedEntry, LoggingStreak, EntryEmotion, EntryActivity, DailyPrompt, ReminderLog
 
 
 @admin.register(JournalEntry)
@@ -11,6 +11,38 @@ class JournalEntryAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at', 'updated_at')
 
 
+@admin.register(DailySummary)
+class DailySummaryAdmin(admin.ModelAdmin):
+    list_display = ('user', 'date', 'entry_count', 'mood_sum', 'stress_count', 'sleep_count', 'updated_at')
+    list_filter = ('date',)
+    search_fields = ('user__email',)
+    date_hierarchy = 'date'
+    readonly_fields = ('updated_at',)
+
+
+@admin.register(MetricPrefix)
+class MetricPrefixAdmin(admin.ModelAdmin):
+    list_display = ('user', 'date', 'updated_at')
+    search_fields = ('user__email',)
+    date_hierarchy = 'date'
+    readonly_fields = ('updated_at',)
+
+
+@admin.register(DeletedEntry)
+class DeletedEntryAdmin(admin.ModelAdmin):
+    list_display = ('user', 'entry_id', 'date', 'deleted_at')
+    search_fields = ('user__email',)
+    date_hierarchy = 'deleted_at'
+    readonly_fields = ('deleted_at',)
+
+
+@admin.register(LoggingStreak)
+class LoggingStreakAdmin(admin.ModelAdmin):
+    list_display = ('user', 'current_streak', 'longest_streak', 'last_entry_date', 'updated_at')
+    search_fields = ('user__email',)
+    readonly_fields = ('updated_at',)
+
+
 @admin.register(EntryEmotion)
 class EntryEmotionAdmin(admin.ModelAdmin):
     list_display = ('entry', 'emotion', 'created_at')
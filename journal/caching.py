@@ -0,0 +1,50 @@
+"""Per-user data versioning for cached and conditional responses.
+
+Every user row carries a ``data_version`` that increases on each entry, tag
+or settings write. Cached values derived from a user's data are keyed with
+it, so a write orphans all older keys at once instead of deleting them one
+by one. Because the version lives on the user row, which the auth middleware
+loads anyway, reading it costs no extra query.
+
+Tag names are shared by all users and change without touching any user row,
+so keys also carry the tag catalog's generation, which is read once per
+request together with the other shared generations.
+"""
+
+from django.contrib.auth import get_user_model
+from django.db.models import F
+
+from accounts.catalog import get_generation as get_catalog_generation
+
+User = get_user_model()
+
+
+def bump_data_version(user_id):
+    """Increment the user's data version as part of the current transaction.
+    
+    The update rolls back with a failed write, and the row lock serializes
+    concurrent writers for the same user, so the version never skips back.
+    """
+    User.objects.filter(pk=user_id).update(data_version=F('data_version') + 1)
+
+
+def lock_user_data(user_id):
+    """Hold the user's row lock until the current transaction ends.
+    
+    Writers that recompute a user's rollups take it before reading the
+    entries, so two concurrent writes for one user apply one after the other
+    instead of both inserting the same rollup row. It is the same lock
+    ``bump_data_version`` takes, and ``NO KEY`` so entry inserts, which only
+    need a key-share lock on the user, are not blocked.
+    """
+    list(User.objects.select_for_update(no_key=True).filter(pk=user_id).values_list('pk', flat=True))
+
+
+def get_data_version(user):
+    return user.data_version
+
+
+def versioned_key(user, name, *parts):
+    """Build a cache key that changes whenever the user's data or the tag catalog changes."""
+    suffix = ':'.join(str(part) for part in parts)
+    return f'journal:{name}:{user.pk}:v{get_data_version(user)}:c{get_catalog_generation()}:{suffix}'
@@ -0,0 +1,170 @@
+"""Helpers for shaping journal data into chart-sized series."""
+
+from datetime import date
+
+from django.db.models import Avg, Count, Max, Min
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+
+from accounts.catalog import get_catalog
+from .models import EntryActivity, EntryEmotion
+
+
+BUCKETS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+METRICS = {
+    'mood': 'mood_rating',
+    'stress': 'stress_level',
+    'sleep': 'sleep_hours',
+}
+
+
+def bucket_entries(entries, bucket):
+    """Aggregate entries into one row per day, week or month in the database.
+    
+    Each row has the bucket start date, the entry count and the mean/min/max of
+    every metric, ordered oldest first.
+    """
+    aggregates = {'count': Count('id')}
+    for name, field in METRICS.items():
+        aggregates[f'{name}_mean'] = Avg(field)
+        aggregates[f'{name}_min'] = Min(field)
+        aggregates[f'{name}_max'] = Max(field)
+    
+    rows = (
+        entries.order_by()
+        .annotate(bucket=BUCKETS[bucket]('date'))
+        .values('bucket')
+        .annotate(**aggregates)
+        .order_by('bucket')
+    )
+    
+    series = []
+    for row in rows:
+        for name in METRICS:
+            if row[f'{name}_mean'] is not None:
+                row[f'{name}_mean'] = round(row[f'{name}_mean'], 2)
+        series.append({'date': row.pop('bucket').isoformat(), **row})
+    return series
+
+
+def downsample_lttb(points, max_points, x, y):
+    """Reduce points to at most max_points with Largest-Triangle-Three-Buckets.
+    
+    ``x`` and ``y`` are callables returning the numeric coordinates of a point.
+    The first and last points are always kept; in between, each bucket keeps
+    the point forming the largest triangle with its neighbours, which preserves
+    the visual shape of the line far better than uniform sampling.
+    """
+    if max_points is None or len(points) <= max_points:
+        return list(points)
+    if max_points < 3:
+        return [points[0], points[-1]][:max_points]
+    
+    sampled = [points[0]]
+    every = (len(points) - 2) / (max_points - 2)
+    anchor = 0
+    
+    for i in range(max_points - 2):
+        # Average of the next bucket acts as the third triangle vertex
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, len(points))
+        next_points = points[next_start:next_end] or [points[-1]]
+        avg_x = sum(x(p) for p in next_points) / len(next_points)
+        avg_y = sum(y(p) for p in next_points) / len(next_points)
+        
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        ax, ay = x(points[anchor]), y(points[anchor])
+        
+        best_area = -1
+        best_index = start
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (y(points[j]) - ay) - (ax - x(points[j])) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best_index = j
+        
+        sampled.append(points[best_index])
+        anchor = best_index
+    
+    sampled.append(points[-1])
+    return sampled
+
+
+def parse_bucket_params(params):
+    """Read ``bucket`` and ``max_points`` from query params.
+    
+    Returns (bucket, max_points), with bucket None when the caller wants raw
+    entries. ``max_points`` on its own implies daily buckets. Raises ValueError
+    on unknown buckets or a non-positive point budget.
+    """
+    bucket = params.get('bucket') or None
+    max_points = params.get('max_points') or None
+    
+    if max_points is not None:
+        max_points = int(max_points)
+        if max_points < 1:
+            raise ValueError('max_points must be positive')
+        bucket = bucket or 'day'
+    
+    if bucket is not None and bucket not in BUCKETS:
+        raise ValueError(f'Unknown bucket: {bucket}')
+    return bucket, max_points
+
+
+def chart_series(entries, bucket, max_points=None):
+    """Bucketed series for entries, downsampled on mean mood to max_points."""
+    series = bucket_entries(entries, bucket)
+    return downsample_lttb(
+        series,
+        max_points,
+        x=lambda row: date.fromisoformat(row['date']).toordinal(),
+        y=lambda row: row['mood_mean'],
+    )
+
+
+def columnar_entries(entries):
+    """Parallel-array payload for an already ordered and sliced entry queryset.
+    
+    Costs three queries: one ``values_list`` over the entries and one per tag
+    relation. Tag names come from the tag catalog and are sent once in a
+    dictionary, referenced by index.
+    """
+    rows = list(entries.values_list('id', 'date', 'mood_rating', 'stress_level', 'sleep_hours'))
+    ids = [row[0] for row in rows]
+    
+    payload = {
+        'ids': ids,
+        'dates': [row[1].isoformat() for row in rows],
+        'mood': [row[2] for row in rows],
+        'stress': [row[3] for row in rows],
+        'sleep': [row[4] for row in rows],
+        'tags': {},
+    }
+    
+    catalog = get_catalog()
+    for key, model, field in (('emotions', EntryEmotion, 'emotion'), ('activities', EntryActivity, 'activity')):
+        tags = catalog.tags(field)
+        links = model.objects.filter(entry_id__in=ids).values_list('entry_id', f'{field}_id')
+        named = sorted(((entry_id, tags[tag_id].name) for entry_id, tag_id in links if tag_id in tags), key=lambda link: link[1])
+        names = []
+        index_of = {}
+        per_entry = {entry_id: [] for entry_id in ids}
+        for entry_id, name in named:
+            if name not in index_of:
+                index_of[name] = len(names)
+                names.append(name)
+            per_entry[entry_id].append(index_of[name])
+        payload[key] = [per_entry[entry_id] for entry_id in ids]
+        payload['tags'][key] = names
+    
+    return payload
+
+
+def columnar_rows(rows, keys):
+    """Turn a list of dicts into one list per key."""
+    return {key: [row[key] for row in rows] for key in keys}
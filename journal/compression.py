@@ -0,0 +1,99 @@
+"""Response compression for the JSON chart APIs.
+
+Brotli is used when the optional ``brotli`` package is installed and the client
+accepts it; otherwise responses fall back to gzip. Streaming responses are
+compressed chunk by chunk so they keep their bounded memory footprint.
+"""
+
+import re
+
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence, compress_string
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+
+# Bodies smaller than this gain nothing from compression
+MIN_COMPRESS_LENGTH = 200
+
+ACCEPT_ENCODING_RE = re.compile(r'\s*([a-z*]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?', re.IGNORECASE)
+
+
+def accepted_encodings(header):
+    """Return the set of content codings the client accepts with q > 0."""
+    accepted = set()
+    for part in header.split(','):
+        match = ACCEPT_ENCODING_RE.match(part)
+        if not match:
+            continue
+        coding, quality = match.group(1).lower(), match.group(2)
+        try:
+            if quality is not None and float(quality) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(coding)
+    return accepted
+
+
+def choose_encoding(request):
+    """Pick the best coding we support for this request, or None."""
+    accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    if brotli is not None and ('br' in accepted or '*' in accepted):
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+
+def brotli_sequence(sequence):
+    """Brotli-compress an iterable of byte chunks lazily."""
+    compressor = brotli.Compressor()
+    for chunk in sequence:
+        data = compressor.process(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def compress_response(request, response):
+    """Compress a response in place according to the request's Accept-Encoding."""
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if response.has_header('Content-Encoding') or response.status_code != 200:
+        return response
+    
+    encoding = choose_encoding(request)
+    if encoding is None:
+        return response
+    
+    if response.streaming:
+        if encoding == 'br':
+            response.streaming_content = brotli_sequence(response.streaming_content)
+        else:
+            response.streaming_content = compress_sequence(response.streaming_content)
+        del response.headers['Content-Length']
+    else:
+        if len(response.content) < MIN_COMPRESS_LENGTH:
+            return response
+        if encoding == 'br':
+            compressed = brotli.compress(response.content)
+        else:
+            compressed = compress_string(response.content)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(response.content))
+    
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+class CompressedResponseMixin:
+    """View mixin that negotiates gzip/brotli compression for its responses."""
+    
+    def dispatch(self, request, *args, **kwargs):
+        response = super().dispatch(request, *args, **kwargs)
+        return compress_response(request, response)
@@ -0,0 +1,130 @@
+"""Assembling the dashboard shared by HomeView and the bootstrap API.
+
+Everything on the dashboard comes from the 30-day rollup, one prefetched query
+for the entries of the days shown, and the persisted streak. Top tags are
+counted from those already-loaded entries, and tag names and the prompt come
+from process-local caches, so neither adds a query.
+"""
+
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.utils import timezone
+
+from accounts.catalog import get_catalog
+from .models import JournalEntry, LoggingStreak
+from .prompts import prompt_for_day
+
+# Days shown in the recent series
+RECENT_DAYS = 7
+TOP_TAGS = 5
+
+
+def build_dashboard(user):
+    """Return the dashboard values as template-ready objects."""
+    today = timezone.now().date()
+    
+    # One row per day for the last 30 days, read from the rollup when it exists
+    thirty_days_ago = today - timedelta(days=30)
+    days = [
+        {
+            'date': summary.date,
+            'avg_mood': summary.avg_mood,
+            'avg_stress': summary.avg_stress,
+            'avg_sleep': summary.avg_sleep,
+            'entry_count': summary.entry_count,
+        }
+        for summary in user.daily_summaries.filter(date__gte=thirty_days_ago).order_by('-date')
+    ]
+    if not days:
+        # Rollup not backfilled yet: aggregate raw entries in a single grouped query
+        days = list(JournalEntry.get_daily_averages(user, thirty_days_ago))
+    
+    # Load the entries behind the last 7 days (and today) in one prefetched query
+    recent_days = days[:RECENT_DAYS]
+    shown_dates = {day['date'] for day in recent_days} | {today}
+    entries_by_date = defaultdict(list)
+    shown_entries = JournalEntry.with_tags(user.entries.filter(date__in=shown_dates).order_by('-created_at'))
+    for entry in shown_entries:
+        entries_by_date[entry.date].append(entry)
+    
+    daily_data = []
+    for day in recent_days:
+        avg_mood = day['avg_mood']
+        avg_stress = day['avg_stress']
+        avg_sleep = day['avg_sleep']
+        
+        daily_data.append({
+            'date': day['date'],
+            'avg_mood': round(avg_mood, 1) if avg_mood else None,
+            'avg_stress': round(avg_stress, 1) if avg_stress else None,
+            'avg_sleep': round(avg_sleep, 1) if avg_sleep else None,
+            'entry_count': day['entry_count'],
+            'entries': entries_by_date[day['date']]
+        })
+    
+    # Calculate 7-day average mood
+    avg_mood_7d = None
+    streak = 0
+    if daily_data:
+        mood_values = [d['avg_mood'] for d in daily_data if d['avg_mood'] is not None]
+        avg_mood_7d = round(sum(mood_values) / len(mood_values), 1) if mood_values else None
+        streak = LoggingStreak.for_user(user).current_as_of(today)
+    
+    recent_entries = [entry for day in daily_data for entry in day['entries']]
+    top_emotions, top_activities = top_tags(recent_entries)
+    
+    return {
+        'today': today,
+        'daily_data': daily_data,
+        'total_entries': sum(day['entry_count'] for day in days),
+        'avg_mood_7d': avg_mood_7d,
+        'streak': streak,
+        'today_entries': entries_by_date[today],
+        'daily_prompt': prompt_for_day(today, user),
+        'top_emotions': top_emotions,
+        'top_activities': top_activities,
+    }
+
+
+def top_tags(entries, limit=TOP_TAGS):
+    """Count tags across entries whose links are already prefetched."""
+    catalog = get_catalog()
+    results = []
+    for relation, field in (('emotions', 'emotion'), ('activities', 'activity')):
+        counts = Counter(
+            getattr(link, f'{field}_id') for entry in entries for link in getattr(entry, relation).all()
+        )
+        tags = catalog.tags(field)
+        named = sorted(
+            ((tags[tag_id].name, count) for tag_id, count in counts.items() if tag_id in tags),
+            key=lambda pair: (-pair[1], pair[0])
+        )
+        results.append(named[:limit])
+    return results[0], results[1]
+
+
+def serialize_dashboard(dashboard):
+    """Turn build_dashboard() output into a JSON-ready payload."""
+    catalog = get_catalog()
+    prompt = dashboard['daily_prompt']
+    return {
+        'today': dashboard['today'].isoformat(),
+        'today_entries': [entry.to_dict(catalog) for entry in dashboard['today_entries']],
+        'daily': [
+            {
+                'date': day['date'].isoformat(),
+                'avg_mood': day['avg_mood'],
+                'avg_stress': day['avg_stress'],
+                'avg_sleep': day['avg_sleep'],
+                'entry_count': day['entry_count'],
+            }
+            for day in dashboard['daily_data']
+        ],
+        'avg_mood_7d': dashboard['avg_mood_7d'],
+        'total_entries': dashboard['total_entries'],
+        'streak': dashboard['streak'],
+        'prompt': {'id': prompt.id, 'text': prompt.text} if prompt else None,
+        'top_emotions': dashboard['top_emotions'],
+        'top_activities': dashboard['top_activities'],
+    }
@@ -0,0 +1,170 @@
+"""Batch ingestion of journal entries queued by offline clients."""
+
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.catalog import get_catalog
+from .caching import bump_data_version
+from .models import DailySummary, EntryActivity, EntryEmotion, JournalEntry, LoggingStreak, MetricPrefix
+from .search import index_entries
+
+
+MAX_BATCH_SIZE = 500
+
+
+class BatchItemError(ValueError):
+    """Raised when a single batch item fails validation."""
+
+
+def ingest_entries(user, items):
+    """Validate and insert a batch of entries in one transaction.
+    
+    Returns one result dict per item, in order. Items whose idempotency key was
+    already stored (in this or an earlier batch) are reported as duplicates with
+    the existing entry id instead of being inserted again.
+    """
+    keys = [item.get('idempotency_key') for item in items if isinstance(item, dict)]
+    keys = [key for key in keys if isinstance(key, str) and key]
+    emotion_ids, activity_ids = set(), set()
+    for item in items:
+        if isinstance(item, dict):
+            emotion_ids.update(_int_set(item.get('emotions', [])))
+            activity_ids.update(_int_set(item.get('activities', [])))
+    
+    # Every id referenced by the batch is validated against the tag catalog
+    catalog = get_catalog()
+    known_emotions = emotion_ids - catalog.unknown_ids('emotion', emotion_ids)
+    known_activities = activity_ids - catalog.unknown_ids('activity', activity_ids)
+    
+    with transaction.atomic():
+        existing = dict(
+            JournalEntry.objects.filter(user=user, idempotency_key__in=keys)
+            .values_list('idempotency_key', 'id')
+        )
+        
+        results = []
+        pending = []
+        seen_keys = {}
+        for index, item in enumerate(items):
+            try:
+                entry, emotions, activities = _build_entry(user, item, known_emotions, known_activities)
+            except BatchItemError as e:
+                results.append({'index': index, 'success': False, 'error': str(e)})
+                continue
+            
+            key = entry.idempotency_key
+            if key in existing:
+                results.append({'index': index, 'idempotency_key': key, 'success': True,
+                                'action': 'duplicate', 'entry_id': existing[key]})
+                continue
+            if key in seen_keys:
+                results.append({'index': index, 'idempotency_key': key, 'success': True,
+                                'action': 'duplicate', 'duplicate_of': seen_keys[key]})
+                continue
+            
+            seen_keys[key] = index
+            result = {'index': index, 'idempotency_key': key, 'success': True, 'action': 'created'}
+            results.append(result)
+            pending.append((result, entry, emotions, activities))
+        
+        if not pending:
+            return results
+        
+        created = JournalEntry.objects.bulk_create([entry for _, entry, _, _ in pending])
+        emotion_links = []
+        activity_links = []
+        for (result, _, emotions, activities), entry in zip(pending, created):
+            result['entry_id'] = entry.id
+            emotion_links.extend(EntryEmotion(entry=entry, emotion_id=tag_id) for tag_id in emotions)
+            activity_links.extend(EntryActivity(entry=entry, activity_id=tag_id) for tag_id in activities)
+        EntryEmotion.objects.bulk_create(emotion_links)
+        EntryActivity.objects.bulk_create(activity_links)
+        
+        # bulk_create skips post_save, so index the new notes explicitly
+        index_entries(created)
+        
+        dates = {entry.date for entry in created}
+        DailySummary.refresh(user, dates)
+        MetricPrefix.refresh(user, dates)
+        LoggingStreak.record_entries(user, dates)
+        bump_data_version(user.id)
+    
+    return results
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _int_set(values):
+    if not isinstance(values, list):
+        return set()
+    return {value for value in values if _is_int(value)}
+
+
+def _build_entry(user, item, known_emotions, known_activities):
+    """Turn one raw batch item into an unsaved entry and its tag ids."""
+    if not isinstance(item, dict):
+        raise BatchItemError('Entry must be an object')
+    
+    key = item.get('idempotency_key')
+    if not isinstance(key, str) or not key or len(key) > 64:
+        raise BatchItemError('idempotency_key must be a non-empty string of at most 64 characters')
+    
+    try:
+        date = datetime.strptime(item['date'], '%Y-%m-%d').date()
+    except (KeyError, TypeError, ValueError):
+        raise BatchItemError('date must be given as YYYY-MM-DD')
+    # Allow a day of slack for clients ahead of the server's timezone
+    if date > timezone.now().date() + timedelta(days=1):
+        raise BatchItemError('date cannot be in the future')
+    
+    mood_rating = _rating(item.get('mood_rating'), 'mood_rating', required=True)
+    stress_level = _rating(item.get('stress_level'), 'stress_level')
+    
+    sleep_hours = item.get('sleep_hours')
+    if sleep_hours is not None:
+        if isinstance(sleep_hours, bool) or not isinstance(sleep_hours, (int, float)) or not 0 <= sleep_hours <= 24:
+            raise BatchItemError('sleep_hours must be a number between 0 and 24')
+    
+    notes = item.get('notes', '')
+    quick_prompt = item.get('quick_prompt', '')
+    if not isinstance(notes, str) or not isinstance(quick_prompt, str):
+        raise BatchItemError('notes and quick_prompt must be strings')
+    
+    emotions = _tag_ids(item.get('emotions', []), known_emotions, 'emotion')
+    activities = _tag_ids(item.get('activities', []), known_activities, 'activity')
+    
+    entry = JournalEntry(
+        user=user,
+        date=date,
+        mood_rating=mood_rating,
+        stress_level=stress_level,
+        sleep_hours=sleep_hours,
+        notes=notes,
+        quick_prompt=quick_prompt,
+        idempotency_key=key,
+    )
+    return entry, emotions, activities
+
+
+def _rating(value, name, required=False):
+    if value is None:
+        if required:
+            raise BatchItemError(f'{name} is required')
+        return None
+    if not _is_int(value) or not 0 <= value <= 10:
+        raise BatchItemError(f'{name} must be an integer between 0 and 10')
+    return value
+
+
+def _tag_ids(values, known, field):
+    if not isinstance(values, list) or not all(_is_int(value) for value in values):
+        raise BatchItemError(f'{field} tags must be a list of integer ids')
+    ids = set(values)
+    missing = ids - known
+    if missing:
+        raise BatchItemError(f'Unknown {field} tag ids: {sorted(missing)}')
+    return ids
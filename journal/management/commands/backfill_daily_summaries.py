@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from journal.caching import lock_user_data
+from journal.models import DailySummary, MetricPrefix
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-user daily summary rollup and metric prefix sums from raw journal entries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', dest='email', help='Only rebuild summaries for this email address')
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id')
+        if options['email']:
+            users = users.filter(email=options['email'])
+        
+        total_users = 0
+        total_days = 0
+        for user in users.iterator():
+            with transaction.atomic():
+                # Entry writes for this user wait until both rollups are rebuilt
+                lock_user_data(user.pk)
+                days = DailySummary.rebuild_for_user(user)
+                MetricPrefix.rebuild_for_user(user)
+            total_users += 1
+            total_days += days
+            self.stdout.write(f'Rebuilt {days} daily summaries and metric prefixes for {user.email}')
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully rebuilt {total_days} daily summaries for {total_users} users!')
+        )
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from journal.models import LoggingStreak
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Recompute persisted logging streaks from raw journal entries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', dest='email', help='Only recompute the streak for this email address')
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id')
+        if options['email']:
+            users = users.filter(email=options['email'])
+        
+        total_users = 0
+        for user in users.iterator():
+            streak = LoggingStreak.recompute(user)
+            total_users += 1
+            self.stdout.write(
+                f'{user.email}: current {streak.current_streak}, longest {streak.longest_streak}'
+            )
+        
+        self.stdout.write(self.style.SUCCESS(f'Successfully recomputed streaks for {total_users} users!'))
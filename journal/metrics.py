@@ -0,0 +1,74 @@
+"""Window statistics from prefix-summed metric pairs.
+
+A ``MetricPrefix`` row stores, for every pair of metrics, ``[n, Σx, Σy, Σxy,
+Σx², Σy²]`` over the entries up to a date where both are present. Subtracting
+the row before a window from the row at its end gives those sums for the
+window alone, and everything here is derived from them in constant time.
+"""
+
+import math
+
+EMPTY = [0, 0, 0, 0, 0, 0]
+
+# Variances this close to zero (relative to Σx²) are rounding noise
+TOLERANCE = 1e-9
+
+
+def subtract(end, before):
+    """Pair sums for the entries counted in ``end`` but not in ``before``."""
+    return {
+        key: [a - b for a, b in zip(sums, before.get(key, EMPTY))]
+        for key, sums in end.items()
+    }
+
+
+class MetricWindow:
+    """Means, Pearson correlations and regression slopes for one date window."""
+    
+    def __init__(self, sums):
+        self.sums = sums
+    
+    def pair(self, x, y):
+        """Return ``[n, Σx, Σy, Σxy, Σx², Σy²]`` with x and y in the order asked."""
+        if f'{x}:{y}' in self.sums:
+            return self.sums[f'{x}:{y}']
+        n, sy, sx, sxy, syy, sxx = self.sums.get(f'{y}:{x}', EMPTY)
+        return [n, sx, sy, sxy, sxx, syy]
+    
+    def count(self, x, y='day'):
+        """Entries in the window with both metrics present."""
+        return self.pair(x, y)[0]
+    
+    def mean(self, metric):
+        n, sx = self.pair(metric, 'day')[:2]
+        return sx / n if n else None
+    
+    def _spread(self, x, y):
+        """Return n and the co-/variances times n, or None below two points."""
+        n, sx, sy, sxy, sxx, syy = self.pair(x, y)
+        if n < 2:
+            return None
+        cov = sxy - sx * sy / n
+        var_x = sxx - sx * sx / n
+        var_y = syy - sy * sy / n
+        if var_x <= TOLERANCE * max(sxx, 1):
+            var_x = 0
+        if var_y <= TOLERANCE * max(syy, 1):
+            var_y = 0
+        return n, cov, var_x, var_y
+    
+    def correlation(self, x, y):
+        """Pearson r over entries with both metrics, or None if either is constant."""
+        spread = self._spread(x, y)
+        if spread is None or not spread[2] or not spread[3]:
+            return None
+        _, cov, var_x, var_y = spread
+        return max(-1.0, min(1.0, cov / math.sqrt(var_x * var_y)))
+    
+    def slope(self, metric, over='day'):
+        """Least-squares change in ``metric`` per unit of ``over`` (per day by default)."""
+        spread = self._spread(over, metric)
+        if spread is None or not spread[2]:
+            return None
+        _, cov, var_x, _ = spread
+        return cov / var_x
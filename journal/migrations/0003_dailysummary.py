@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-17 05:53
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('journal', '0002_alter_journalentry_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+                ('mood_sum', models.IntegerField(default=0)),
+                ('mood_min', models.IntegerField(blank=True, null=True)),
+                ('mood_max', models.IntegerField(blank=True, null=True)),
+                ('stress_sum', models.IntegerField(default=0)),
+                ('stress_count', models.PositiveIntegerField(default=0)),
+                ('stress_min', models.IntegerField(blank=True, null=True)),
+                ('stress_max', models.IntegerField(blank=True, null=True)),
+                ('sleep_sum', models.FloatField(default=0)),
+                ('sleep_count', models.PositiveIntegerField(default=0)),
+                ('sleep_min', models.FloatField(blank=True, null=True)),
+                ('sleep_max', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Daily Summaries',
+                'ordering': ['-date'],
+                'unique_together': {('user', 'date')},
+            },
+        ),
+    ]
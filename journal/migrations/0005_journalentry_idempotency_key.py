@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-17 06:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0004_loggingstreak'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='journalentry',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='journalentry',
+            constraint=models.UniqueConstraint(fields=('user', 'idempotency_key'), name='unique_entry_idempotency_key'),
+        ),
+    ]
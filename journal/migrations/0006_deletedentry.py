@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-17 06:03
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('journal', '0005_journalentry_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_id', models.BigIntegerField()),
+                ('date', models.DateField()),
+                ('idempotency_key', models.CharField(blank=True, max_length=64, null=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deleted_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Deleted Entries',
+                'ordering': ['-deleted_at'],
+                'indexes': [models.Index(fields=['user', 'deleted_at'], name='deletedentry_user_deleted_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute(
+            "ALTER TABLE journal_journalentry ADD COLUMN search_vector tsvector "
+            "GENERATED ALWAYS AS (to_tsvector('english', coalesce(notes, '') || ' ' || coalesce(quick_prompt, ''))) STORED"
+        )
+        schema_editor.execute(
+            "CREATE INDEX journal_entry_search_idx ON journal_journalentry USING GIN (search_vector)"
+        )
+    elif connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            if not cursor.fetchone()[0]:
+                return
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE journal_entry_fts USING fts5(user_id UNINDEXED, notes, quick_prompt)"
+        )
+        schema_editor.execute(
+            "INSERT INTO journal_entry_fts (rowid, user_id, notes, quick_prompt) "
+            "SELECT id, user_id, notes, quick_prompt FROM journal_journalentry"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS journal_entry_search_idx")
+        schema_editor.execute("ALTER TABLE journal_journalentry DROP COLUMN IF EXISTS search_vector")
+    elif connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS journal_entry_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0006_deletedentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,48 @@
+from django.db import migrations
+from django.db.models import Count, Max, Min, Sum
+
+
+def rebuild_daily_summaries(apps, schema_editor):
+    """Roll up every existing entry, so stats and reports work right after deploy."""
+    JournalEntry = apps.get_model('journal', 'JournalEntry')
+    DailySummary = apps.get_model('journal', 'DailySummary')
+    rows = (
+        JournalEntry.objects.order_by('user_id', 'date')
+        .values('user_id', 'date')
+        .annotate(
+            entry_count=Count('id'),
+            mood_sum=Sum('mood_rating'),
+            mood_min=Min('mood_rating'),
+            mood_max=Max('mood_rating'),
+            stress_sum=Sum('stress_level'),
+            stress_count=Count('stress_level'),
+            stress_min=Min('stress_level'),
+            stress_max=Max('stress_level'),
+            sleep_sum=Sum('sleep_hours'),
+            sleep_count=Count('sleep_hours'),
+            sleep_min=Min('sleep_hours'),
+            sleep_max=Max('sleep_hours'),
+        )
+    )
+
+    DailySummary.objects.all().delete()
+    batch = []
+    for row in rows.iterator(chunk_size=2000):
+        row['stress_sum'] = row['stress_sum'] or 0
+        row['sleep_sum'] = row['sleep_sum'] or 0
+        batch.append(DailySummary(**row))
+        if len(batch) >= 500:
+            DailySummary.objects.bulk_create(batch)
+            batch = []
+    DailySummary.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0009_metric_prefix'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_daily_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+from datetime import date
+from itertools import combinations
+
+from django.db import migrations
+
+METRICS = ['day', 'mood_rating', 'stress_level', 'sleep_hours']
+PAIRS = list(combinations(METRICS, 2))
+EPOCH = date(2000, 1, 1)
+
+
+def rebuild_metric_prefixes(apps, schema_editor):
+    """Store running pair sums for every existing entry, as ``MetricPrefix.rebuild_for_user`` does."""
+    JournalEntry = apps.get_model('journal', 'JournalEntry')
+    MetricPrefix = apps.get_model('journal', 'MetricPrefix')
+    rows = JournalEntry.objects.order_by('user_id', 'date').values_list('user_id', 'date', *METRICS[1:])
+
+    MetricPrefix.objects.all().delete()
+    batch = []
+    user_id, running, prefix = None, {}, None
+    for entry_user_id, entry_date, *values in rows.iterator(chunk_size=2000):
+        if entry_user_id != user_id:
+            user_id, running, prefix = entry_user_id, {}, None
+        if prefix is None or prefix.date != entry_date:
+            running = {key: list(sums) for key, sums in running.items()}
+            prefix = MetricPrefix(user_id=user_id, date=entry_date, sums=running)
+            batch.append(prefix)
+
+        point = dict(zip(METRICS, [(entry_date - EPOCH).days, *values]))
+        for x, y in PAIRS:
+            a, b = point[x], point[y]
+            sums = running.setdefault(f'{x}:{y}', [0] * 6)
+            if a is None or b is None:
+                continue
+            sums[0] += 1
+            sums[1] += a
+            sums[2] += b
+            sums[3] += a * b
+            sums[4] += a * a
+            sums[5] += b * b
+
+        # Keep the current day in the batch until it is complete
+        if len(batch) > 500:
+            MetricPrefix.objects.bulk_create(batch[:-1])
+            batch = batch[-1:]
+    MetricPrefix.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0010_backfill_daily_summaries'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_metric_prefixes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations
+
+
+def index_owner_token(apps, schema_editor):
+    """Rebuild the FTS5 table with an indexed owner token, so MATCH only visits one user's rows."""
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite' or 'journal_entry_fts' not in connection.introspection.table_names():
+        return
+    schema_editor.execute("DROP TABLE journal_entry_fts")
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE journal_entry_fts USING fts5(notes, quick_prompt, owner)"
+    )
+    schema_editor.execute(
+        "INSERT INTO journal_entry_fts (rowid, notes, quick_prompt, owner) "
+        "SELECT id, notes, quick_prompt, 'u' || user_id FROM journal_journalentry"
+    )
+
+
+def unindex_owner_token(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite' or 'journal_entry_fts' not in connection.introspection.table_names():
+        return
+    schema_editor.execute("DROP TABLE journal_entry_fts")
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE journal_entry_fts USING fts5(user_id UNINDEXED, notes, quick_prompt)"
+    )
+    schema_editor.execute(
+        "INSERT INTO journal_entry_fts (rowid, user_id, notes, quick_prompt) "
+        "SELECT id, user_id, notes, quick_prompt FROM journal_journalentry"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0011_backfill_metric_prefixes'),
+    ]
+
+    operations = [
+        migrations.RunPython(index_owner_token, unindex_owner_token),
+    ]
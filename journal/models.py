@@ -1,7 +1,12 @@
-from django.db import models
+from datetime import date as date_cls, timedelta
+from itertools import combinations
+from django.db import connection, models
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+from accounts.catalog import get_catalog
 from accounts.models import EmotionTag, ActivityTag
+from .caching import lock_user_data
+from .metrics import MetricWindow, subtract
 
 User = get_user_model()
 
@@ -22,6 +27,9 @@ class JournalEntry(models.Model):
     notes = models.TextField(blank=True, help_text="Free text notes about the day")
     quick_prompt = models.TextField(blank=True, help_text="Response to daily prompt")
     
+    # Client-generated key so offline clients can safely replay queued entries
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True)
+    
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -29,10 +37,79 @@ class JournalEntry(models.Model):
     class Meta:
         ordering = ['-date', '-created_at']
         verbose_name_plural = 'Journal Entries'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'idempotency_key'], name='unique_entry_idempotency_key'),
+        ]
+        indexes = [
+            # Date-range reads, charts and keyset history pages
+            models.Index(fields=['user', 'date', 'created_at'], name='entry_user_date_idx'),
+            # Delta sync watermarks
+            models.Index(fields=['user', 'updated_at'], name='entry_user_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.email} - {self.date} (Mood: {self.mood_rating})"
     
+    def to_dict(self, catalog=None):
+        """Serialize the entry for JSON APIs; use with_tags() to avoid per-entry queries.
+        
+        Tag names come from the in-memory tag catalog; pass one in when
+        serializing many entries to skip the per-call freshness check.
+        """
+        catalog = catalog or get_catalog()
+        return {
+            'id': self.id,
+            'date': self.date.isoformat(),
+            'mood_rating': self.mood_rating,
+            'stress_level': self.stress_level,
+            'sleep_hours': self.sleep_hours,
+            'notes': self.notes,
+            'emotions': catalog.names('emotion', [e.emotion_id for e in self.emotions.all()]),
+            'activities': catalog.names('activity', [a.activity_id for a in self.activities.all()]),
+        }
+    
+    @staticmethod
+    def count_tags(entries, limit=None):
+        """Count emotion and activity tags across entries with one GROUP BY each.
+        
+        Returns two lists of (name, count) pairs, most frequent first. Counts
+        are grouped by tag id and named from the tag catalog, so no join is needed.
+        """
+        catalog = get_catalog()
+        results = []
+        for link_model, field in ((EntryEmotion, 'emotion'), (EntryActivity, 'activity')):
+            counts = (
+                link_model.objects.filter(entry__in=entries)
+                .values_list(f'{field}_id')
+                .annotate(count=models.Count('id'))
+                .order_by()
+            )
+            tags = catalog.tags(field)
+            named = sorted(
+                ((tags[tag_id].name, count) for tag_id, count in counts if tag_id in tags),
+                key=lambda pair: (-pair[1], pair[0])
+            )
+            results.append(named[:limit] if limit is not None else named)
+        return results[0], results[1]
+    
+    @staticmethod
+    def with_tags(queryset):
+        """Prefetch emotion and activity links with one query each.
+        
+        Links carry only tag ids; resolve them through the tag catalog
+        (``to_dict``, ``attach_tags``) rather than following the FK.
+        """
+        return queryset.prefetch_related('emotions', 'activities')
+    
+    @staticmethod
+    def attach_tags(entries, catalog=None):
+        """Resolve the tag FKs of prefetched links from memory, for templates."""
+        catalog = catalog or get_catalog()
+        for entry in entries:
+            catalog.attach(entry.emotions.all(), 'emotion')
+            catalog.attach(entry.activities.all(), 'activity')
+        return entries
+    
     @classmethod
     def get_daily_average_mood(cls, user, date):
         """Calculate average mood for a specific day."""
@@ -56,6 +133,464 @@ class JournalEntry(models.Model):
         if not entries.exists():
             return None
         return entries.aggregate(avg_sleep=models.Avg('sleep_hours'))['avg_sleep']
+    
+    @classmethod
+    def get_daily_averages(cls, user, start_date):
+        """Average mood, stress and sleep per day since start_date, in one grouped query."""
+        return (
+            cls.objects.filter(user=user, date__gte=start_date)
+            .order_by()
+            .values('date')
+            .annotate(
+                avg_mood=models.Avg('mood_rating'),
+                avg_stress=models.Avg('stress_level'),
+                avg_sleep=models.Avg('sleep_hours'),
+                entry_count=models.Count('id'),
+            )
+            .order_by('-date')
+        )
+
+
+class DailySummary(models.Model):
+    """Per-user daily rollup of journal entries, kept in sync on every entry write."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_summaries')
+    date = models.DateField()
+    entry_count = models.PositiveIntegerField(default=0)
+    
+    # Mood is required on every entry, so entry_count doubles as the mood count
+    mood_sum = models.IntegerField(default=0)
+    mood_min = models.IntegerField(null=True, blank=True)
+    mood_max = models.IntegerField(null=True, blank=True)
+    
+    stress_sum = models.IntegerField(default=0)
+    stress_count = models.PositiveIntegerField(default=0)
+    stress_min = models.IntegerField(null=True, blank=True)
+    stress_max = models.IntegerField(null=True, blank=True)
+    
+    sleep_sum = models.FloatField(default=0)
+    sleep_count = models.PositiveIntegerField(default=0)
+    sleep_min = models.FloatField(null=True, blank=True)
+    sleep_max = models.FloatField(null=True, blank=True)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-date']
+        unique_together = ['user', 'date']
+        verbose_name_plural = 'Daily Summaries'
+    
+    def __str__(self):
+        return f"{self.user.email} - {self.date} ({self.entry_count} entries)"
+    
+    @property
+    def avg_mood(self):
+        return self.mood_sum / self.entry_count if self.entry_count else None
+    
+    @property
+    def avg_stress(self):
+        return self.stress_sum / self.stress_count if self.stress_count else None
+    
+    @property
+    def avg_sleep(self):
+        return self.sleep_sum / self.sleep_count if self.sleep_count else None
+    
+    @staticmethod
+    def entry_aggregates():
+        """Aggregate expressions that turn raw entries into summary columns."""
+        return {
+            'entry_count': models.Count('id'),
+            'mood_sum': models.Sum('mood_rating'),
+            'mood_min': models.Min('mood_rating'),
+            'mood_max': models.Max('mood_rating'),
+            'stress_sum': models.Sum('stress_level'),
+            'stress_count': models.Count('stress_level'),
+            'stress_min': models.Min('stress_level'),
+            'stress_max': models.Max('stress_level'),
+            'sleep_sum': models.Sum('sleep_hours'),
+            'sleep_count': models.Count('sleep_hours'),
+            'sleep_min': models.Min('sleep_hours'),
+            'sleep_max': models.Max('sleep_hours'),
+        }
+    
+    @classmethod
+    def from_aggregate_row(cls, user, row):
+        """Build an unsaved summary from one grouped aggregate row."""
+        row = dict(row)
+        row['stress_sum'] = row['stress_sum'] or 0
+        row['sleep_sum'] = row['sleep_sum'] or 0
+        return cls(user=user, **row)
+    
+    @classmethod
+    def refresh(cls, user, dates):
+        """Recompute the summary rows for the given dates from raw entries.
+        
+        Call inside the same transaction as the entry write so the rollup never
+        drifts from the entries it summarises. The user's row is locked first,
+        so concurrent writes for the same user and day are serialized.
+        """
+        dates = set(dates)
+        if not dates:
+            return
+        
+        lock_user_data(user.pk)
+        rows = (
+            JournalEntry.objects.filter(user=user, date__in=dates)
+            .order_by()
+            .values('date')
+            .annotate(**cls.entry_aggregates())
+        )
+        existing = dict(cls.objects.filter(user=user, date__in=dates).values_list('date', 'id'))
+        
+        now = timezone.now()
+        to_create, to_update = [], []
+        for row in rows:
+            summary = cls.from_aggregate_row(user, row)
+            summary.updated_at = now
+            if row['date'] in existing:
+                summary.pk = existing.pop(row['date'])
+                to_update.append(summary)
+            else:
+                to_create.append(summary)
+        
+        fields = list(cls.entry_aggregates()) + ['updated_at']
+        if to_update:
+            cls.objects.bulk_update(to_update, fields)
+        if to_create:
+            cls.objects.bulk_create(to_create, update_conflicts=True, unique_fields=['user', 'date'], update_fields=fields)
+        
+        # Days that no longer have any entries lose their rollup row
+        if existing:
+            cls.objects.filter(id__in=existing.values()).delete()
+    
+    @classmethod
+    def rebuild_for_user(cls, user):
+        """Replace every summary row for a user from their raw entries.
+        
+        Call inside a transaction; like ``refresh`` it takes the user's row
+        lock first, so an entry write cannot slip in between the delete and
+        the insert.
+        """
+        lock_user_data(user.pk)
+        rows = (
+            JournalEntry.objects.filter(user=user)
+            .order_by()
+            .values('date')
+            .annotate(**cls.entry_aggregates())
+        )
+        cls.objects.filter(user=user).delete()
+        summaries = [cls.from_aggregate_row(user, row) for row in rows]
+        cls.objects.bulk_create(summaries, batch_size=500)
+        return len(summaries)
+    
+    @classmethod
+    def window_totals(cls, user, start_date, end_date=None):
+        """Combine summary rows into overall averages for a date window."""
+        rows = cls.objects.filter(user=user, date__gte=start_date)
+        if end_date is not None:
+            rows = rows.filter(date__lte=end_date)
+        totals = rows.aggregate(
+            entry_count=models.Sum('entry_count'),
+            mood_sum=models.Sum('mood_sum'),
+            mood_min=models.Min('mood_min'),
+            mood_max=models.Max('mood_max'),
+            stress_sum=models.Sum('stress_sum'),
+            stress_count=models.Sum('stress_count'),
+            sleep_sum=models.Sum('sleep_sum'),
+            sleep_count=models.Sum('sleep_count'),
+        )
+        entry_count = totals['entry_count'] or 0
+        stress_count = totals['stress_count'] or 0
+        sleep_count = totals['sleep_count'] or 0
+        return {
+            'entry_count': entry_count,
+            'avg_mood': totals['mood_sum'] / entry_count if entry_count else None,
+            'min_mood': totals['mood_min'],
+            'max_mood': totals['mood_max'],
+            'avg_stress': totals['stress_sum'] / stress_count if stress_count else None,
+            'stress_count': stress_count,
+            'avg_sleep': totals['sleep_sum'] / sleep_count if sleep_count else None,
+            'sleep_count': sleep_count,
+        }
+
+
+class MetricPrefix(models.Model):
+    """Running totals of every metric pair over a user's entries, per logged day.
+    
+    ``sums`` maps ``"<x>:<y>"`` to ``[n, Σx, Σy, Σxy, Σx², Σy²]`` over the
+    entries dated on or before ``date`` that have both metrics. ``day`` is the
+    entry date as a day number, so pairing it with a metric gives its trend.
+    Any window's statistics are the difference of two rows (see ``window``).
+    """
+    METRICS = ['day', 'mood_rating', 'stress_level', 'sleep_hours']
+    PAIRS = list(combinations(METRICS, 2))
+    
+    # Day numbers count from here to keep the squared sums small
+    EPOCH = date_cls(2000, 1, 1)
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='metric_prefixes')
+    date = models.DateField()
+    sums = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['date']
+        unique_together = ['user', 'date']
+        verbose_name_plural = 'Metric prefixes'
+    
+    def __str__(self):
+        return f"{self.user.email} - totals through {self.date}"
+    
+    @classmethod
+    def day_sums(cls, user, start=None):
+        """Per-day pair sums for the user's entries from ``start`` on, in one query."""
+        entries = JournalEntry.objects.filter(user=user)
+        if start is not None:
+            entries = entries.filter(date__gte=start)
+        
+        days = {}
+        for date, *values in entries.order_by().values_list('date', *cls.METRICS[1:]):
+            point = dict(zip(cls.METRICS, [(date - cls.EPOCH).days, *values]))
+            day = days.setdefault(date, {f'{x}:{y}': [0] * 6 for x, y in cls.PAIRS})
+            for x, y in cls.PAIRS:
+                a, b = point[x], point[y]
+                if a is None or b is None:
+                    continue
+                sums = day[f'{x}:{y}']
+                sums[0] += 1
+                sums[1] += a
+                sums[2] += b
+                sums[3] += a * b
+                sums[4] += a * a
+                sums[5] += b * b
+        return days
+    
+    @classmethod
+    def refresh(cls, user, dates):
+        """Rewrite the prefix rows from the earliest of ``dates`` onward.
+        
+        Only entries on or after that day are read, so a write for today
+        touches a single row. Call inside the entry write's transaction, like
+        ``DailySummary.refresh``, which also takes the user's row lock.
+        """
+        dates = set(dates)
+        if not dates:
+            return
+        lock_user_data(user.pk)
+        start = min(dates)
+        base = cls.objects.filter(user=user, date__lt=start).order_by('-date').values_list('sums', flat=True).first()
+        cls._accumulate(user, start, base or {}, cls.day_sums(user, start))
+    
+    @classmethod
+    def rebuild_for_user(cls, user):
+        """Replace every prefix row for a user from their raw entries, under the user's row lock."""
+        lock_user_data(user.pk)
+        return cls._accumulate(user, None, {}, cls.day_sums(user))
+    
+    @classmethod
+    def _accumulate(cls, user, start, running, days):
+        """Store running totals for ``days`` on top of ``running``, from ``start`` on."""
+        rows = cls.objects.filter(user=user)
+        if start is not None:
+            rows = rows.filter(date__gte=start)
+        existing = dict(rows.values_list('date', 'id'))
+        
+        now = timezone.now()
+        to_create, to_update = [], []
+        for date in sorted(days):
+            running = {
+                key: [a + b for a, b in zip(running.get(key, [0] * 6), sums)]
+                for key, sums in days[date].items()
+            }
+            prefix = cls(user=user, date=date, sums=running, updated_at=now)
+            if date in existing:
+                prefix.pk = existing.pop(date)
+                to_update.append(prefix)
+            else:
+                to_create.append(prefix)
+        
+        if to_update:
+            cls.objects.bulk_update(to_update, ['sums', 'updated_at'], batch_size=500)
+        if to_create:
+            cls.objects.bulk_create(to_create, batch_size=500, update_conflicts=True,
+                                    unique_fields=['user', 'date'], update_fields=['sums', 'updated_at'])
+        
+        # Days that no longer have any entries lose their row
+        if existing:
+            cls.objects.filter(id__in=existing.values()).delete()
+        return len(days)
+    
+    @classmethod
+    def window(cls, user, start_date, end_date):
+        """Statistics for entries dated ``start_date``..``end_date``, read from two rows."""
+        rows = cls.objects.filter(user=user).order_by('-date').values_list('sums', flat=True)
+        end = rows.filter(date__lte=end_date).first() or {}
+        before = rows.filter(date__lt=start_date).first() or {}
+        return MetricWindow(subtract(end, before))
+
+
+class LoggingStreak(models.Model):
+    """Persisted logging streak per user, maintained incrementally on entry writes."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='logging_streak')
+    current_streak = models.PositiveIntegerField(default=0)
+    longest_streak = models.PositiveIntegerField(default=0)
+    last_entry_date = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    # Consecutive dates share the same (day number - row number) value, so grouping
+    # on it yields one row per unbroken run of logged days ("gaps and islands").
+    ISLAND_KEYS = {
+        'postgresql': 'day - CAST(ROW_NUMBER() OVER (ORDER BY day) AS integer)',
+        'sqlite': 'julianday(day) - ROW_NUMBER() OVER (ORDER BY day)',
+        'mysql': 'TO_DAYS(day) - ROW_NUMBER() OVER (ORDER BY day)',
+    }
+    
+    def __str__(self):
+        return f"{self.user.email} - {self.current_streak} days (best {self.longest_streak})"
+    
+    def current_as_of(self, today):
+        """Streak length as seen on ``today``; a day without an entry resets it."""
+        if self.last_entry_date == today:
+            return self.current_streak
+        return 0
+    
+    @classmethod
+    def for_user(cls, user):
+        """Return the user's streak row, computing it from history on first use."""
+        try:
+            return cls.objects.get(user=user)
+        except cls.DoesNotExist:
+            return cls.recompute(user)
+    
+    @classmethod
+    def record_entry(cls, user, date):
+        """Extend the streak for a newly written entry without rescanning history."""
+        return cls.record_entries(user, [date])
+    
+    @classmethod
+    def record_entries(cls, user, dates):
+        """Extend the streak for entries written on the given dates."""
+        dates = sorted(set(dates))
+        if not dates:
+            return cls.for_user(user)
+        
+        streak, created = cls.objects.select_for_update().get_or_create(user=user)
+        last = streak.last_entry_date
+        
+        if created or (last is not None and dates[0] < last):
+            # First sighting of this user, or a backfilled day that may join two runs
+            return cls.recompute(user)
+        
+        for date in dates:
+            if last == date:
+                continue
+            if last is not None and date == last + timedelta(days=1):
+                streak.current_streak += 1
+            else:
+                streak.current_streak = 1
+            last = date
+            streak.longest_streak = max(streak.longest_streak, streak.current_streak)
+        
+        if streak.last_entry_date != last:
+            streak.last_entry_date = last
+            streak.save()
+        return streak
+    
+    @classmethod
+    def record_removal(cls, user, date):
+        """Repair the streak after an entry delete, if that emptied its day."""
+        if JournalEntry.objects.filter(user=user, date=date).exists():
+            return cls.for_user(user)
+        return cls.recompute(user)
+    
+    @classmethod
+    def recompute(cls, user):
+        """Rebuild the streak from scratch with one set-based query."""
+        current, longest, last = cls._compute_islands(user)
+        streak, _ = cls.objects.update_or_create(user=user, defaults={
+            'current_streak': current,
+            'longest_streak': longest,
+            'last_entry_date': last,
+        })
+        return streak
+    
+    @classmethod
+    def _compute_islands(cls, user):
+        """Return (length of latest run, longest run, last logged date)."""
+        island_key = cls.ISLAND_KEYS.get(connection.vendor)
+        if island_key is None:
+            return cls._compute_islands_in_python(user)
+        
+        sql = f"""
+            WITH days AS (
+                SELECT DISTINCT date AS day FROM {JournalEntry._meta.db_table} WHERE user_id = %s
+            ),
+            islands AS (
+                SELECT MAX(day) AS end_day, COUNT(*) AS length
+                FROM (SELECT day, {island_key} AS island FROM days) grouped
+                GROUP BY island
+            )
+            SELECT length, (SELECT MAX(length) FROM islands), end_day
+            FROM islands ORDER BY end_day DESC LIMIT 1
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [user.pk])
+            row = cursor.fetchone()
+        
+        if row is None:
+            return 0, 0, None
+        current, longest, last = row
+        if isinstance(last, str):
+            last = date_cls.fromisoformat(last)
+        return current, longest, last
+    
+    @classmethod
+    def _compute_islands_in_python(cls, user):
+        """Fallback for database backends without a known island expression."""
+        days = JournalEntry.objects.filter(user=user).order_by('date').values_list('date', flat=True).distinct()
+        current = longest = 0
+        last = None
+        for day in days:
+            current = current + 1 if last is not None and day == last + timedelta(days=1) else 1
+            longest = max(longest, current)
+            last = day
+        return current, longest, last
+
+
+class DeletedEntry(models.Model):
+    """Tombstone left behind when an entry is deleted, so sync clients can drop it."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='deleted_entries')
+    entry_id = models.BigIntegerField()
+    date = models.DateField()
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-deleted_at']
+        verbose_name_plural = 'Deleted Entries'
+        indexes = [
+            models.Index(fields=['user', 'deleted_at'], name='deletedentry_user_deleted_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.email} - entry {self.entry_id} deleted {self.deleted_at}"
+    
+    @classmethod
+    def record(cls, entry):
+        """Leave a tombstone for an entry that is about to be deleted."""
+        return cls.objects.create(
+            user_id=entry.user_id,
+            entry_id=entry.id,
+            date=entry.date,
+            idempotency_key=entry.idempotency_key,
+        )
+    
+    def to_dict(self):
+        return {
+            'id': self.entry_id,
+            'date': self.date.isoformat(),
+            'idempotency_key': self.idempotency_key,
+            'deleted_at': self.deleted_at.isoformat(),
+        }
 
 
 class EntryEmotion(models.Model):
@@ -113,6 +648,9 @@ class ReminderLog(models.Model):
     
     class Meta:
         ordering = ['-sent_at']
+        indexes = [
+            models.Index(fields=['user', 'sent_at'], name='reminderlog_user_sent_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.email} - {self.reminder_type} - {self.sent_at.date()}"
@@ -0,0 +1,51 @@
+"""Deterministic daily prompt rotation.
+
+Active prompts are loaded once per process and reused until a prompt is
+saved or deleted. Changes bump a database generation counter (see
+``accounts.generations``), so every process reloads its copy on the next
+request instead of waiting for a restart.
+"""
+
+from django.utils import timezone
+
+from accounts.generations import bump_generation, get_generation as get_named_generation
+from .models import DailyPrompt
+
+GENERATION_KEY = 'journal:prompts'
+
+# (generation, active prompts in rotation order) for this process
+_active_prompts = (None, [])
+
+
+def get_generation():
+    return get_named_generation(GENERATION_KEY)
+
+
+def invalidate_prompts():
+    """Make every process reload the active prompts on its next lookup."""
+    global _active_prompts
+    _active_prompts = (None, [])
+    bump_generation(GENERATION_KEY)
+
+
+def active_prompts():
+    """Return the active prompts in rotation order, loading them if stale."""
+    global _active_prompts
+    generation = get_generation()
+    if _active_prompts[0] != generation:
+        _active_prompts = (generation, list(DailyPrompt.objects.filter(is_active=True)))
+    return _active_prompts[1]
+
+
+def prompt_for_day(day=None, user=None):
+    """Pick the prompt of the day, stable for the whole day.
+
+    Passing a user offsets the rotation by their id, so users see different
+    prompts on the same day while each still gets one prompt per day.
+    """
+    prompts = active_prompts()
+    if not prompts:
+        return None
+    day = day or timezone.now().date()
+    offset = user.pk if user is not None else 0
+    return prompts[(day.toordinal() + offset) % len(prompts)]
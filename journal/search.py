@@ -0,0 +1,133 @@
+"""Full-text search over journal notes and prompt responses.
+
+PostgreSQL keeps a generated ``tsvector`` column with a GIN index on the entry
+table itself. SQLite keeps an FTS5 shadow table that signal handlers update on
+every entry save and delete; each row carries an indexed owner token, so a
+MATCH only walks the searching user's rows. Any other backend falls back to
+``icontains``.
+"""
+
+import re
+from collections import namedtuple
+
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+
+FTS_TABLE = 'journal_entry_fts'
+SEARCH_VECTOR_COLUMN = 'search_vector'
+MAX_RESULTS = 500
+
+# Control characters that cannot appear in user text mark the highlighted
+# spans until the snippet has been HTML-escaped
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+
+SearchHit = namedtuple('SearchHit', ['id', 'rank', 'snippet'])
+
+_backend_cache = {}
+
+
+def owner_token(user_id):
+    """The FTS5 token that tags every row of one user's entries."""
+    return f'u{user_id}'
+
+
+def search_backend():
+    """Return 'postgresql', 'sqlite' or None when no full-text index exists."""
+    alias = connection.alias
+    if alias not in _backend_cache:
+        backend = None
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                columns = connection.introspection.get_table_description(cursor, 'journal_journalentry')
+            if any(column.name == SEARCH_VECTOR_COLUMN for column in columns):
+                backend = 'postgresql'
+        elif connection.vendor == 'sqlite':
+            if FTS_TABLE in connection.introspection.table_names():
+                backend = 'sqlite'
+        _backend_cache[alias] = backend
+    return _backend_cache[alias]
+
+
+def reset_backend_cache():
+    _backend_cache.clear()
+
+
+def index_entries(entries):
+    """Write entries into the SQLite shadow table; a no-op on other backends."""
+    if search_backend() != 'sqlite':
+        return
+    entries = list(entries)
+    if not entries:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(entry.id,) for entry in entries])
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, notes, quick_prompt, owner) VALUES (%s, %s, %s, %s)',
+            [(entry.id, entry.notes, entry.quick_prompt, owner_token(entry.user_id)) for entry in entries],
+        )
+
+
+def unindex_entries(entry_ids):
+    """Drop entries from the SQLite shadow table; a no-op on other backends."""
+    if search_backend() != 'sqlite' or not entry_ids:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(entry_id,) for entry_id in entry_ids])
+
+
+def search_entries(user, query, limit=MAX_RESULTS):
+    """Rank the user's entries against a free-text query.
+    
+    Returns a list of SearchHit, best match first, or None when there is no
+    full-text backend and the caller should fall back to substring matching.
+    """
+    backend = search_backend()
+    if backend is None:
+        return None
+    
+    terms = re.findall(r'\w+', query)
+    if not terms:
+        return []
+    
+    if backend == 'postgresql':
+        sql = f"""
+            SELECT id, ts_rank({SEARCH_VECTOR_COLUMN}, query) AS rank,
+                   ts_headline('english', notes || ' ' || quick_prompt, query,
+                               'StartSel=' || %s || ', StopSel=' || %s || ', MaxFragments=2, MaxWords=20')
+            FROM journal_journalentry, websearch_to_tsquery('english', %s) query
+            WHERE user_id = %s AND {SEARCH_VECTOR_COLUMN} @@ query
+            ORDER BY rank DESC, id DESC
+            LIMIT %s
+        """
+        params = [HIGHLIGHT_START, HIGHLIGHT_END, ' '.join(terms), user.pk, limit]
+    else:
+        # Quote every term so user input can never be parsed as FTS5 syntax.
+        # The owner token restricts the match itself to the user's rows and
+        # carries no weight in the rank.
+        match = ' '.join(f'"{term}"*' for term in terms)
+        match = f'owner:"{owner_token(user.pk)}" AND {{notes quick_prompt}}:({match})'
+        sql = f"""
+            SELECT rowid, bm25({FTS_TABLE}, 1.0, 1.0, 0.0) AS rank,
+                   snippet({FTS_TABLE}, -1, %s, %s, '…', 16)
+            FROM {FTS_TABLE}
+            WHERE {FTS_TABLE} MATCH %s
+            ORDER BY rank, rowid DESC
+            LIMIT %s
+        """
+        params = [HIGHLIGHT_START, HIGHLIGHT_END, match, limit]
+    
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    return [SearchHit(entry_id, rank, highlight(snippet)) for entry_id, rank, snippet in rows]
+
+
+def highlight(snippet):
+    """Escape a raw snippet and turn the highlight markers into <mark> tags."""
+    if not snippet:
+        return ''
+    html = escape(snippet).replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>')
+    return mark_safe(html)
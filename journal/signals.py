@@ -0,0 +1,23 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import prompts, search
+from .models import DailyPrompt, JournalEntry
+
+
+@receiver(post_save, sender=JournalEntry)
+def index_entry(sender, instance, **kwargs):
+    """Keep the SQLite full-text shadow table in step with entry saves."""
+    search.index_entries([instance])
+
+
+@receiver(post_delete, sender=JournalEntry)
+def unindex_entry(sender, instance, **kwargs):
+    search.unindex_entries([instance.id])
+
+
+@receiver(post_save, sender=DailyPrompt)
+@receiver(post_delete, sender=DailyPrompt)
+def invalidate_prompt_rotation(sender, **kwargs):
+    """Reload the cached prompt rotation after any prompt change."""
+    prompts.invalidate_prompts()
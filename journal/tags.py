@@ -0,0 +1,47 @@
+"""Assigning emotion and activity tags to journal entries."""
+
+from django.db import transaction
+
+from accounts.catalog import get_catalog
+from .models import EntryActivity, EntryEmotion
+
+
+class InvalidTagError(ValueError):
+    """Raised when an entry is tagged with ids that do not exist."""
+
+
+def set_entry_tags(entry, emotion_ids=None, activity_ids=None, is_new=False):
+    """Make the entry's tags match the given ids with O(1) queries per tag type.
+    
+    Unknown ids are rejected against the in-memory tag catalog before anything
+    is written. Passing ``None`` leaves that tag type untouched; ``is_new``
+    skips reading links a fresh entry cannot have yet.
+    """
+    with transaction.atomic():
+        if emotion_ids is not None:
+            _sync_links(entry, EntryEmotion, 'emotion', emotion_ids, is_new)
+        if activity_ids is not None:
+            _sync_links(entry, EntryActivity, 'activity', activity_ids, is_new)
+
+
+def _sync_links(entry, link_model, field, tag_ids, is_new):
+    try:
+        wanted = {int(tag_id) for tag_id in tag_ids}
+    except (TypeError, ValueError):
+        raise InvalidTagError(f'Invalid {field} tag ids: {tag_ids}')
+    
+    missing = get_catalog().unknown_ids(field, wanted)
+    if missing:
+        raise InvalidTagError(f'Unknown {field} tag ids: {sorted(missing)}')
+    
+    current = set()
+    if not is_new:
+        current = set(link_model.objects.filter(entry=entry).values_list(f'{field}_id', flat=True))
+    
+    removed = current - wanted
+    if removed:
+        link_model.objects.filter(entry=entry, **{f'{field}_id__in': removed}).delete()
+    
+    added = wanted - current
+    if added:
+        link_model.objects.bulk_create([link_model(entry=entry, **{f'{field}_id': tag_id}) for tag_id in sorted(added)])
@@ -11,6 +11,9 @@ urlpatterns = [
     path('entry/<int:entry_id>/delete/', views.DeleteEntryView.as_view(), name='delete_entry'),
     path('history/', views.HistoryView.as_view(), name='history'),
     path('api/entries/', views.EntriesAPIView.as_view(), name='entries_api'),
+    path('api/entries/batch/', views.BatchEntriesAPIView.as_view(), name='batch_entries_api'),
+    path('api/sync/', views.SyncAPIView.as_view(), name='sync_api'),
     path('api/stats/', views.StatsAPIView.as_view(), name='stats_api'),
+    path('api/dashboard/', views.DashboardAPIView.as_view(), name='dashboard_api'),
     path('api/quick-add/', views.QuickAddAPIView.as_view(), name='quick_add_api'),
 ]
@@ -3,98 +3,42 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from django.views.generic import TemplateView, View
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
+from django.core.cache import cache
 from django.utils import timezone
-from django.db.models import Avg, Count, Q
-from django.core.paginator import Paginator
+from django.db import IntegrityError, transaction
+from django.db.models import Q, Sum
 import json
 from datetime import datetime, timedelta
-from .models import JournalEntry, EntryEmotion, EntryActivity, DailyPrompt
-from accounts.models import EmotionTag, ActivityTag, UserEmotionTag, UserActivityTag
+from .charts import chart_series, columnar_entries, columnar_rows, parse_bucket_params
+from .caching import bump_data_version, versioned_key
+from .compression import CompressedResponseMixin
+from .conditional import DataVersionETagMixin
+from .dashboard import build_dashboard, serialize_dashboard
+from .ingest import MAX_BATCH_SIZE, ingest_entries
+from .prompts import get_generation as get_prompt_generation, prompt_for_day
+from .search import search_entries
+from .sync import changes_since
+from .tags import set_entry_tags
+from .models import JournalEntry, DailySummary, DeletedEntry, LoggingStreak, MetricPrefix
+from accounts.catalog import get_catalog
 
 
-class HomeView(LoginRequiredMixin, TemplateView):
+class HomeView(LoginRequiredMixin, DataVersionETagMixin, TemplateView):
     """Main dashboard view."""
     template_name = 'journal/home.html'
     
-    def dispatch(self, request, *args, **kwargs):
-        # Check if user has completed onboarding
-        if not hasattr(request.user, 'settings'):
-            from accounts.models import UserSettings
-            UserSettings.objects.create(user=request.user)
-            from django.shortcuts import redirect
-            return redirect('journal:onboarding')
-        return super().dispatch(request, *args, **kwargs)
-    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        user = self.request.user
-        
-        # Get unique dates with entries for the last 30 days
-        from datetime import timedelta
-        thirty_days_ago = timezone.now().date() - timedelta(days=30)
-        entries = user.entries.filter(date__gte=thirty_days_ago)
-        
-        # Get unique dates and calculate daily averages
-        unique_dates = entries.values_list('date', flat=True).distinct().order_by('-date')
-        daily_data = []
-        
-        for date in unique_dates[:7]:  # Last 7 days
-            daily_entries = entries.filter(date=date)
-            avg_mood = JournalEntry.get_daily_average_mood(user, date)
-            avg_stress = JournalEntry.get_daily_average_stress(user, date)
-            avg_sleep = JournalEntry.get_daily_average_sleep(user, date)
-            
-            daily_data.append({
-                'date': date,
-                'avg_mood': round(avg_mood, 1) if avg_mood else None,
-                'avg_stress': round(avg_stress, 1) if avg_stress else None,
-                'avg_sleep': round(avg_sleep, 1) if avg_sleep else None,
-                'entry_count': daily_entries.count(),
-                'entries': daily_entries
-            })
-        
-        context['daily_data'] = daily_data
-        context['recent_entries'] = daily_data  # For backward compatibility
-        context['total_entries'] = entries.count()
-        
-        # Calculate 7-day average mood
-        if daily_data:
-            mood_values = [d['avg_mood'] for d in daily_data if d['avg_mood'] is not None]
-            context['avg_mood_7d'] = round(sum(mood_values) / len(mood_values), 1) if mood_values else None
-            context['streak'] = self.calculate_streak(user)
-        else:
-            context['avg_mood_7d'] = None
-            context['streak'] = 0
-        
-        # Get today's entries (all entries for today)
-        today = timezone.now().date()
-        context['today'] = today
-        context['today_entries'] = user.entries.filter(date=today).order_by('-created_at')
-        context['today_entry'] = context['today_entries'].first()  # For backward compatibility
-        
-        # Get daily prompt
-        context['daily_prompt'] = DailyPrompt.objects.filter(is_active=True).order_by('?').first()
-        
+        dashboard = build_dashboard(self.request.user)
+        context.update(dashboard)
+        context['recent_entries'] = dashboard['daily_data']  # For backward compatibility
+        context['today_entry'] = dashboard['today_entries'][0] if dashboard['today_entries'] else None  # For backward compatibility
         return context
     
-    def calculate_streak(self, user):
-        """Calculate current logging streak."""
-        entries = user.entries.all().order_by('-date')
-        if not entries.exists():
-            return 0
-        
-        streak = 0
-        current_date = timezone.now().date()
-        
-        for entry in entries:
-            if entry.date == current_date - timedelta(days=streak):
-                streak += 1
-                current_date = entry.date
-            else:
-                break
-        
-        return streak
+    def get_etag_parts(self, request):
+        """The page also embeds the CSRF secret, today's prompt and any flash messages."""
+        return request.META.get('CSRF_COOKIE'), get_prompt_generation(), len(messages.get_messages(request))
 
 
 class OnboardingView(LoginRequiredMixin, TemplateView):
@@ -103,8 +47,9 @@ class OnboardingView(LoginRequiredMixin, TemplateView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['emotion_tags'] = EmotionTag.objects.filter(is_default=True)
-        context['activity_tags'] = ActivityTag.objects.filter(is_default=True)
+        catalog = get_catalog()
+        context['emotion_tags'] = catalog.default_emotions()
+        context['activity_tags'] = catalog.default_activities()
         return context
 
 
@@ -116,16 +61,17 @@ class NewEntryView(LoginRequiredMixin, TemplateView):
         context = super().get_context_data(**kwargs)
         user = self.request.user
         today = timezone.now().date()
+        catalog = get_catalog()
         
         # Get user's selected tags
-        context['user_emotion_tags'] = user.emotion_tags.all()
-        context['user_activity_tags'] = user.activity_tags.all()
+        context['user_emotion_tags'] = catalog.attach(user.emotion_tags.all(), 'emotion')
+        context['user_activity_tags'] = catalog.attach(user.activity_tags.all(), 'activity')
         
         # Get default activity tags as fallback
-        context['activity_tags'] = ActivityTag.objects.filter(is_default=True)
+        context['activity_tags'] = catalog.default_activities()
         
         # Get daily prompt
-        context['daily_prompt'] = DailyPrompt.objects.filter(is_active=True).order_by('?').first()
+        context['daily_prompt'] = prompt_for_day(user=user)
         
         # Get today's entries (if any)
         today_entries = JournalEntry.objects.filter(user=user, date=today).order_by('-created_at')
@@ -135,8 +81,9 @@ class NewEntryView(LoginRequiredMixin, TemplateView):
         # For backward compatibility, set existing_entry to the most recent one
         context['existing_entry'] = today_entries.first() if today_entries.exists() else None
         if context['existing_entry']:
-            context['existing_emotions'] = [e.emotion for e in context['existing_entry'].emotions.all()]
-            context['existing_activities'] = [a.activity for a in context['existing_entry'].activities.all()]
+            existing_entry = context['existing_entry']
+            context['existing_emotions'] = [e.emotion for e in catalog.attach(existing_entry.emotions.all(), 'emotion')]
+            context['existing_activities'] = [a.activity for a in catalog.attach(existing_entry.activities.all(), 'activity')]
         else:
             context['existing_emotions'] = []
             context['existing_activities'] = []
@@ -150,13 +97,14 @@ class EditEntryView(LoginRequiredMixin, View):
     def get(self, request, entry_id):
         entry = get_object_or_404(JournalEntry, id=entry_id, user=request.user)
         user = request.user
+        catalog = get_catalog()
         
         context = {
             'entry': entry,
-            'user_emotion_tags': user.emotion_tags.all(),
-            'user_activity_tags': user.activity_tags.all(),
-            'selected_emotions': [e.emotion for e in entry.emotions.all()],
-            'selected_activities': [a.activity for a in entry.activities.all()],
+            'user_emotion_tags': catalog.attach(user.emotion_tags.all(), 'emotion'),
+            'user_activity_tags': catalog.attach(user.activity_tags.all(), 'activity'),
+            'selected_emotions': [e.emotion for e in catalog.attach(entry.emotions.all(), 'emotion')],
+            'selected_activities': [a.activity for a in catalog.attach(entry.activities.all(), 'activity')],
         }
         return render(request, 'journal/edit_entry.html', context)
     
@@ -166,26 +114,20 @@ class EditEntryView(LoginRequiredMixin, View):
             data = json.loads(request.body)
             entry = get_object_or_404(JournalEntry, id=entry_id, user=request.user)
             
-            # Update entry fields
-            entry.mood_rating = data['mood_rating']
-            entry.stress_level = data.get('stress_level')
-            entry.sleep_hours = data.get('sleep_hours')
-            entry.notes = data.get('notes', '')
-            entry.save()
-            
-            # Clear existing emotions and activities
-            entry.emotions.all().delete()
-            entry.activities.all().delete()
-            
-            # Add emotions
-            for emotion_id in data.get('emotions', []):
-                emotion = EmotionTag.objects.get(id=emotion_id)
-                EntryEmotion.objects.create(entry=entry, emotion=emotion)
-            
-            # Add activities
-            for activity_id in data.get('activities', []):
-                activity = ActivityTag.objects.get(id=activity_id)
-                EntryActivity.objects.create(entry=entry, activity=activity)
+            with transaction.atomic():
+                # Update entry fields
+                entry.mood_rating = data['mood_rating']
+                entry.stress_level = data.get('stress_level')
+                entry.sleep_hours = data.get('sleep_hours')
+                entry.notes = data.get('notes', '')
+                entry.save()
+                
+                # Apply only the tag changes
+                set_entry_tags(entry, data.get('emotions', []), data.get('activities', []))
+                
+                DailySummary.refresh(request.user, [entry.date])
+                MetricPrefix.refresh(request.user, [entry.date])
+                bump_data_version(request.user.id)
             
             return JsonResponse({
                 'success': True, 
@@ -206,14 +148,29 @@ class DeleteEntryView(LoginRequiredMixin, View):
     
     def post(self, request, entry_id):
         entry = get_object_or_404(JournalEntry, id=entry_id, user=request.user)
-        entry.delete()
+        with transaction.atomic():
+            DeletedEntry.record(entry)
+            entry.delete()
+            DailySummary.refresh(request.user, [entry.date])
+            MetricPrefix.refresh(request.user, [entry.date])
+            LoggingStreak.record_removal(request.user, entry.date)
+            bump_data_version(request.user.id)
         messages.success(request, 'Entry deleted successfully.')
         return redirect('journal:home')
 
 
 class HistoryView(LoginRequiredMixin, TemplateView):
-    """View and search journal entries history."""
+    """View and search journal entries history.
+    
+    Entries are keyset-paginated on (date, created_at, id): the "older" and
+    "newer" links carry the position of the last or first row shown, so a page
+    deep into the history costs the same as the first one. Search results keep
+    their relevance order and page by rank instead.
+    """
     template_name = 'journal/history.html'
+    page_size = 20
+    # Filtered result sets are only counted up to this many rows
+    count_cap = 1000
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -228,8 +185,14 @@ class HistoryView(LoginRequiredMixin, TemplateView):
         # Filter entries
         entries = user.entries.all()
         
+        hits = None
         if search:
-            entries = entries.filter(notes__icontains=search)
+            hits = search_entries(user, search)
+            if hits is None:
+                # No full-text index on this database
+                entries = entries.filter(Q(notes__icontains=search) | Q(quick_prompt__icontains=search))
+            else:
+                entries = entries.filter(id__in=[hit.id for hit in hits])
         
         if mood_min:
             entries = entries.filter(mood_rating__gte=int(mood_min))
@@ -240,10 +203,17 @@ class HistoryView(LoginRequiredMixin, TemplateView):
         if date_to:
             entries = entries.filter(date__lte=datetime.strptime(date_to, '%Y-%m-%d').date())
         
-        # Paginate results
-        paginator = Paginator(entries, 20)
-        page_number = self.request.GET.get('page')
-        context['entries'] = paginator.get_page(page_number)
+        filtered = bool(search or mood_min or date_from or date_to)
+        if hits is not None:
+            page, older, newer = self.get_ranked_page(entries, hits)
+        else:
+            page, older, newer = self.get_keyset_page(entries)
+        JournalEntry.attach_tags(page)
+        
+        context['entries'] = page
+        context['older_query'] = self.page_query(older)
+        context['newer_query'] = self.page_query(newer)
+        context['entry_count'], context['entry_count_capped'] = self.approximate_count(user, entries, filtered)
         
         # Pass filter values back to template
         context['search'] = search
@@ -252,38 +222,226 @@ class HistoryView(LoginRequiredMixin, TemplateView):
         context['date_to'] = date_to
         
         return context
+    
+    def get_keyset_page(self, entries):
+        """Fetch one page around the ``before``/``after`` cursor, newest first."""
+        params = self.request.GET
+        entries = JournalEntry.with_tags(entries)
+        try:
+            after = self.parse_cursor(params.get('after'))
+            before = None if after else self.parse_cursor(params.get('before'))
+        except ValueError:
+            after = before = None
+        
+        if after:
+            # Walk forwards from the cursor, then flip back to newest first
+            page = list(self.newer_than(entries, after).order_by('date', 'created_at', 'id')[:self.page_size + 1])
+            has_newer = len(page) > self.page_size
+            page = page[:self.page_size][::-1]
+            has_older = True
+        else:
+            entries = self.older_than(entries, before) if before else entries
+            page = list(entries.order_by('-date', '-created_at', '-id')[:self.page_size + 1])
+            has_older = len(page) > self.page_size
+            page = page[:self.page_size]
+            has_newer = before is not None
+        
+        if not page:
+            return page, None, None
+        older = {'before': self.make_cursor(page[-1])} if has_older else None
+        newer = {'after': self.make_cursor(page[0])} if has_newer else None
+        return page, older, newer
+    
+    def get_ranked_page(self, entries, hits):
+        """Fetch one page of search results in relevance order."""
+        try:
+            offset = max(int(self.request.GET.get('rank', 0)), 0)
+        except ValueError:
+            offset = 0
+        
+        # Hits are already capped, so ordering the matching ids is cheap
+        ranked = {hit.id: (position, hit.snippet) for position, hit in enumerate(hits)}
+        matching = sorted(entries.values_list('id', flat=True), key=lambda entry_id: ranked[entry_id][0])
+        page_ids = matching[offset:offset + self.page_size]
+        
+        page = sorted(
+            JournalEntry.with_tags(JournalEntry.objects.filter(id__in=page_ids)),
+            key=lambda entry: ranked[entry.id][0]
+        )
+        for entry in page:
+            entry.search_snippet = ranked[entry.id][1]
+        
+        older = {'rank': offset + self.page_size} if offset + self.page_size < len(matching) else None
+        newer = {'rank': max(offset - self.page_size, 0)} if offset else None
+        return page, older, newer
+    
+    def approximate_count(self, user, entries, filtered):
+        """Return (count, capped) without scanning the whole history.
+        
+        The unfiltered total comes from the daily rollup; filtered sets are
+        counted only up to ``count_cap`` rows.
+        """
+        if not filtered:
+            total = user.daily_summaries.aggregate(total=Sum('entry_count'))['total']
+            if total is not None:
+                return total, False
+        count = entries.order_by()[:self.count_cap + 1].count()
+        return min(count, self.count_cap), count > self.count_cap
+    
+    def page_query(self, cursor):
+        """Build the query string for a pagination link, keeping the filters."""
+        if cursor is None:
+            return None
+        params = self.request.GET.copy()
+        for key in ('before', 'after', 'rank', 'page'):
+            params.pop(key, None)
+        params.update(cursor)
+        return params.urlencode()
+    
+    @staticmethod
+    def newer_than(entries, cursor):
+        cursor_date, cursor_created, cursor_id = cursor
+        return entries.filter(
+            Q(date__gt=cursor_date)
+            | Q(date=cursor_date, created_at__gt=cursor_created)
+            | Q(date=cursor_date, created_at=cursor_created, id__gt=cursor_id)
+        )
+    
+    @staticmethod
+    def older_than(entries, cursor):
+        cursor_date, cursor_created, cursor_id = cursor
+        return entries.filter(
+            Q(date__lt=cursor_date)
+            | Q(date=cursor_date, created_at__lt=cursor_created)
+            | Q(date=cursor_date, created_at=cursor_created, id__lt=cursor_id)
+        )
+    
+    @staticmethod
+    def parse_cursor(value):
+        """Decode a ``<date>_<created_at>_<id>`` cursor."""
+        if not value:
+            return None
+        date_str, created_str, entry_id = value.split('_', 2)
+        created_at = datetime.fromisoformat(created_str)
+        if timezone.is_naive(created_at):
+            created_at = timezone.make_aware(created_at)
+        return datetime.strptime(date_str, '%Y-%m-%d').date(), created_at, int(entry_id)
+    
+    @staticmethod
+    def make_cursor(entry):
+        return f"{entry.date.isoformat()}_{entry.created_at.isoformat()}_{entry.id}"
 
 
-class EntriesAPIView(LoginRequiredMixin, View):
-    """API endpoint for journal entries."""
+class EntriesAPIView(LoginRequiredMixin, DataVersionETagMixin, CompressedResponseMixin, View):
+    """API endpoint for journal entries.
+    
+    Pages are keyset-paginated on (date, id): pass the returned ``next_cursor``
+    back as ``cursor`` to fetch the next page. ``format=ndjson`` or ``stream=1``
+    stream the whole range page by page instead. ``format=columnar`` returns the
+    page as parallel arrays. ``bucket=day|week|month`` and ``max_points`` return
+    pre-aggregated, downsampled chart points.
+    """
+    default_page_size = 500
+    max_page_size = 1000
     
     def get(self, request):
         """Get entries for charts and data."""
         user = request.user
-        days = int(request.GET.get('days', 30))
+        try:
+            days = max(int(request.GET.get('days', 30)), 0)
+            limit = min(max(int(request.GET.get('limit', self.default_page_size)), 1), self.max_page_size)
+            cursor = self.parse_cursor(request.GET.get('cursor'))
+            bucket, max_points = parse_bucket_params(request.GET)
+        except ValueError:
+            return JsonResponse({'error': 'Invalid days, limit, cursor or bucket'}, status=400)
         
         # Get entries for the specified number of days
         start_date = timezone.now().date() - timedelta(days=days)
-        entries = user.entries.filter(date__gte=start_date).order_by('date')
-        
-        data = []
-        for entry in entries:
-            data.append({
-                'date': entry.date.isoformat(),
-                'mood_rating': entry.mood_rating,
-                'stress_level': entry.stress_level,
-                'sleep_hours': entry.sleep_hours,
-                'notes': entry.notes,
-                'emotions': [e.emotion.name for e in entry.emotions.all()],
-                'activities': [a.activity.name for a in entry.activities.all()],
-            })
+        format_type = request.GET.get('format', 'json')
+        if bucket:
+            series = chart_series(user.entries.filter(date__gte=start_date), bucket, max_points)
+            if format_type == 'columnar':
+                series = columnar_rows(series, series[0].keys() if series else ())
+            return JsonResponse({'bucket': bucket, 'buckets': series})
+        
+        entries = JournalEntry.with_tags(user.entries.filter(date__gte=start_date).order_by('date', 'id'))
+        
+        if format_type == 'ndjson':
+            catalog = get_catalog()
+            lines = (json.dumps(entry.to_dict(catalog)) + '\n' for entry in self.iter_entries(entries, cursor, limit))
+            return StreamingHttpResponse(lines, content_type='application/x-ndjson')
+        
+        if format_type == 'columnar':
+            payload = columnar_entries(self.after_cursor(entries, cursor)[:limit])
+            ids = payload['ids']
+            payload['next_cursor'] = f"{payload['dates'][-1]}_{ids[-1]}" if len(ids) == limit else None
+            return JsonResponse(payload)
+        
+        if format_type != 'json':
+            return JsonResponse({'error': 'Invalid format'}, status=400)
+        
+        if request.GET.get('stream') in ('1', 'true'):
+            return StreamingHttpResponse(
+                self.stream_json(self.iter_entries(entries, cursor, limit)),
+                content_type='application/json'
+            )
         
-        return JsonResponse({'entries': data})
+        page = self.get_page(entries, cursor, limit)
+        next_cursor = self.make_cursor(page[-1]) if len(page) == limit else None
+        catalog = get_catalog()
+        return JsonResponse({
+            'entries': [entry.to_dict(catalog) for entry in page],
+            'next_cursor': next_cursor,
+        })
+    
+    @staticmethod
+    def parse_cursor(value):
+        """Decode a ``<date>_<id>`` cursor into a (date, id) tuple."""
+        if not value:
+            return None
+        date_str, entry_id = value.split('_', 1)
+        return datetime.strptime(date_str, '%Y-%m-%d').date(), int(entry_id)
+    
+    @staticmethod
+    def make_cursor(entry):
+        return f"{entry.date.isoformat()}_{entry.id}"
+    
+    @staticmethod
+    def after_cursor(entries, cursor):
+        """Restrict entries to those strictly after the cursor position."""
+        if cursor is None:
+            return entries
+        cursor_date, cursor_id = cursor
+        return entries.filter(Q(date__gt=cursor_date) | Q(date=cursor_date, id__gt=cursor_id))
+    
+    def get_page(self, entries, cursor, limit):
+        """Fetch the page of entries strictly after the cursor position."""
+        return list(self.after_cursor(entries, cursor)[:limit])
+    
+    def iter_entries(self, entries, cursor, limit):
+        """Yield every entry after the cursor, holding at most one page in memory."""
+        while True:
+            page = self.get_page(entries, cursor, limit)
+            yield from page
+            if len(page) < limit:
+                return
+            cursor = (page[-1].date, page[-1].id)
+    
+    @staticmethod
+    def stream_json(entries):
+        """Stream a ``{"entries": [...]}`` document one entry at a time."""
+        yield '{"entries": ['
+        catalog = get_catalog()
+        for index, entry in enumerate(entries):
+            yield (',' if index else '') + json.dumps(entry.to_dict(catalog))
+        yield ']}'
 
 
-class StatsAPIView(LoginRequiredMixin, View):
+class StatsAPIView(LoginRequiredMixin, DataVersionETagMixin, CompressedResponseMixin, View):
     """API endpoint for statistics and insights."""
     
+    cache_timeout = 60 * 60
+    
     def get(self, request):
         """Get user statistics."""
         user = request.user
@@ -291,39 +449,71 @@ class StatsAPIView(LoginRequiredMixin, View):
         
         # Get entries for the specified number of days
         start_date = timezone.now().date() - timedelta(days=days)
-        entries = user.entries.filter(date__gte=start_date)
         
-        if not entries.exists():
+        # Results stay valid until the user's data version moves on
+        cache_key = versioned_key(user, 'stats', days, start_date)
+        stats = cache.get(cache_key)
+        if stats is None:
+            stats = self.compute_stats(user, start_date)
+            cache.set(cache_key, stats, self.cache_timeout)
+        
+        if not stats['total_entries']:
             return JsonResponse({'message': 'No data available'})
         
-        # Calculate statistics
-        avg_mood = entries.aggregate(avg=Avg('mood_rating'))['avg']
-        avg_stress = entries.aggregate(avg=Avg('stress_level'))['avg']
-        avg_sleep = entries.aggregate(avg=Avg('sleep_hours'))['avg']
+        top_emotions = stats['top_emotions']
+        top_activities = stats['top_activities']
+        if request.GET.get('format') == 'columnar':
+            top_emotions = {'names': [name for name, _ in top_emotions], 'counts': [count for _, count in top_emotions]}
+            top_activities = {'names': [name for name, _ in top_activities], 'counts': [count for _, count in top_activities]}
         
-        # Get most common emotions and activities
-        emotion_counts = {}
-        activity_counts = {}
+        return JsonResponse(dict(stats, top_emotions=top_emotions, top_activities=top_activities))
+    
+    def compute_stats(self, user, start_date):
+        """One rollup aggregate plus one GROUP BY per tag type."""
+        totals = DailySummary.window_totals(user, start_date)
+        if not totals['entry_count']:
+            return {'total_entries': 0}
         
-        for entry in entries:
-            for emotion in entry.emotions.all():
-                emotion_counts[emotion.emotion.name] = emotion_counts.get(emotion.emotion.name, 0) + 1
-            
-            for activity in entry.activities.all():
-                activity_counts[activity.activity.name] = activity_counts.get(activity.activity.name, 0) + 1
+        avg_mood = totals['avg_mood']
+        avg_stress = totals['avg_stress']
+        avg_sleep = totals['avg_sleep']
         
-        # Sort by count
-        top_emotions = sorted(emotion_counts.items(), key=lambda x: x[1], reverse=True)[:5]
-        top_activities = sorted(activity_counts.items(), key=lambda x: x[1], reverse=True)[:5]
+        # Get most common emotions and activities
+        entries = user.entries.filter(date__gte=start_date)
+        top_emotions, top_activities = JournalEntry.count_tags(entries, limit=5)
         
-        return JsonResponse({
+        return {
             'avg_mood': round(avg_mood, 2) if avg_mood else None,
             'avg_stress': round(avg_stress, 2) if avg_stress else None,
             'avg_sleep': round(avg_sleep, 2) if avg_sleep else None,
-            'total_entries': entries.count(),
+            'total_entries': totals['entry_count'],
             'top_emotions': top_emotions,
             'top_activities': top_activities,
-        })
+        }
+
+
+class DashboardAPIView(LoginRequiredMixin, DataVersionETagMixin, CompressedResponseMixin, View):
+    """Everything the home screen shows, in one request.
+    
+    Returns today's entries, the recent daily series, the 7-day average, the
+    streak, the prompt of the day and the top tags. The payload is cached per
+    user data version and served with an ETag, so an unchanged dashboard costs
+    a 304.
+    """
+    cache_timeout = 60 * 60
+    
+    def get(self, request):
+        user = request.user
+        today = timezone.now().date()
+        cache_key = versioned_key(user, 'dashboard', today, get_prompt_generation())
+        payload = cache.get(cache_key)
+        if payload is None:
+            payload = serialize_dashboard(build_dashboard(user))
+            cache.set(cache_key, payload, self.cache_timeout)
+        return JsonResponse(payload)
+    
+    def get_etag_parts(self, request):
+        return (get_prompt_generation(),)
 
 
 class QuickAddAPIView(LoginRequiredMixin, View):
@@ -336,25 +526,24 @@ class QuickAddAPIView(LoginRequiredMixin, View):
             user = request.user
             today = timezone.now().date()
             
-            # Create new entry (allow multiple entries per day)
-            entry = JournalEntry.objects.create(
-                user=user,
-                date=today,
-                mood_rating=data['mood_rating'],
-                stress_level=data.get('stress_level'),
-                sleep_hours=data.get('sleep_hours'),
-                notes=data.get('notes', ''),
-            )
-            
-            # Add emotions
-            for emotion_id in data.get('emotions', []):
-                emotion = EmotionTag.objects.get(id=emotion_id)
-                EntryEmotion.objects.create(entry=entry, emotion=emotion)
-            
-            # Add activities
-            for activity_id in data.get('activities', []):
-                activity = ActivityTag.objects.get(id=activity_id)
-                EntryActivity.objects.create(entry=entry, activity=activity)
+            with transaction.atomic():
+                # Create new entry (allow multiple entries per day)
+                entry = JournalEntry.objects.create(
+                    user=user,
+                    date=today,
+                    mood_rating=data['mood_rating'],
+                    stress_level=data.get('stress_level'),
+                    sleep_hours=data.get('sleep_hours'),
+                    notes=data.get('notes', ''),
+                )
+                
+                # Add emotions and activities
+                set_entry_tags(entry, data.get('emotions', []), data.get('activities', []), is_new=True)
+                
+                DailySummary.refresh(user, [entry.date])
+                MetricPrefix.refresh(user, [entry.date])
+                LoggingStreak.record_entry(user, entry.date)
+                bump_data_version(user.id)
             
             return JsonResponse({
                 'success': True, 
@@ -368,3 +557,71 @@ class QuickAddAPIView(LoginRequiredMixin, View):
             print(f"Error in QuickAddAPIView: {str(e)}")
             print(f"Traceback: {traceback.format_exc()}")
             return JsonResponse({'success': False, 'error': str(e)})
+
+
+class BatchEntriesAPIView(LoginRequiredMixin, View):
+    """API endpoint for uploading entries queued by offline clients.
+    
+    Expects ``{"entries": [...]}`` where every item carries its own ``date`` and a
+    client-generated ``idempotency_key``, so replaying a batch is safe.
+    """
+    
+    def post(self, request):
+        """Create a batch of entries in one transaction."""
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({'success': False, 'error': 'Invalid JSON'}, status=400)
+        
+        items = data.get('entries') if isinstance(data, dict) else None
+        if not isinstance(items, list):
+            return JsonResponse({'success': False, 'error': 'entries must be a list'}, status=400)
+        if len(items) > MAX_BATCH_SIZE:
+            return JsonResponse({'success': False, 'error': f'At most {MAX_BATCH_SIZE} entries per batch'}, status=400)
+        
+        try:
+            results = ingest_entries(request.user, items)
+        except IntegrityError:
+            # A concurrent upload stored one of these keys first; a retry reports it as a duplicate
+            return JsonResponse({'success': False, 'error': 'Conflicting upload in progress, please retry'}, status=409)
+        
+        return JsonResponse({
+            'success': True,
+            'created': sum(1 for result in results if result.get('action') == 'created'),
+            'results': results,
+        })
+
+
+class SyncAPIView(LoginRequiredMixin, CompressedResponseMixin, View):
+    """API endpoint for incremental sync.
+    
+    Returns entries created or changed and tombstones for entries deleted after
+    the ``since`` watermark. Pass the returned ``watermark`` as ``since`` on the
+    next call; while ``has_more`` is true, call again straight away.
+    """
+    default_page_size = 500
+    max_page_size = 1000
+    
+    def get(self, request):
+        """Get changes since the client's watermark."""
+        try:
+            limit = min(max(int(request.GET.get('limit', self.default_page_size)), 1), self.max_page_size)
+            since = request.GET.get('since')
+            if since:
+                # An unencoded "+" in the UTC offset arrives as a space
+                since = datetime.fromisoformat(since.replace(' ', '+'))
+                if timezone.is_naive(since):
+                    since = timezone.make_aware(since)
+            else:
+                since = None
+        except ValueError:
+            return JsonResponse({'error': 'Invalid since or limit'}, status=400)
+        
+        changes = changes_since(request.user, since, limit)
+        catalog = get_catalog()
+        return JsonResponse({
+            'entries': [dict(entry.to_dict(catalog), updated_at=entry.updated_at.isoformat()) for entry in changes['entries']],
+            'deleted': [tombstone.to_dict() for tombstone in changes['deleted']],
+            'watermark': changes['watermark'].isoformat(),
+            'has_more': changes['has_more'],
+        })
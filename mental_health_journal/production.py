@@ -29,6 +29,7 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+EXPORT_ROOT = os.path.join(BASE_DIR, 'private', 'exports')
 
 # Security settings
 SECURE_BROWSER_XSS_FILTER = True
@@ -124,6 +124,9 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Data export archives; kept outside MEDIA_ROOT so they are never served publicly
+EXPORT_ROOT = BASE_DIR / 'private' / 'exports'
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -157,6 +160,16 @@ ACCOUNT_LOGIN_BY_CODE_ENABLED = False
 ACCOUNT_LOGIN_BY_CODE_TIMEOUT = 300
 ACCOUNT_LOGOUT_ON_GET = True
 
+# Load UserSettings with the user on every request. ModelBackend stays listed
+# so sessions created before the switch remain valid.
+AUTHENTICATION_BACKENDS = [
+    'accounts.backends.SettingsModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+# New accounts go through onboarding once
+ACCOUNT_SIGNUP_REDIRECT_URL = '/app/onboarding/'
+
 # Custom forms
 ACCOUNT_FORMS = {
     'signup': 'accounts.forms.CustomSignupForm',
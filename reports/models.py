@@ -39,6 +39,9 @@ class Report(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='report_user_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.email} - {self.title}"
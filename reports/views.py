@@ -9,9 +9,12 @@ from django.template.loader import render_to_string
 from django.conf import settings
 import json
 import uuid
+import numpy as np
 from datetime import datetime, timedelta
 from .models import Report, ReportAccess
-from journal.models import JournalEntry, EntryEmotion, EntryActivity
+from journal.models import JournalEntry, DailySummary, EntryEmotion, EntryActivity
+from accounts.catalog import get_catalog
+from analytics import slope, volatility
 
 
 class ReportsView(LoginRequiredMixin, TemplateView):
@@ -86,79 +89,52 @@ class GenerateReportView(LoginRequiredMixin, View):
     
     def generate_report_data(self, user, entries, start_date, end_date):
         """Generate comprehensive report data."""
+        totals = DailySummary.window_totals(user, start_date, end_date)
+        emotion_stats, activity_stats = JournalEntry.count_tags(entries)
+        moods = np.array(list(entries.values_list('mood_rating', flat=True)), dtype=float)
+        trend = slope(moods)
+        mood_volatility = volatility(moods)
         data = {
             'summary': {
-                'total_entries': entries.count(),
+                'total_entries': totals['entry_count'],
                 'date_range': f"{start_date} to {end_date}",
                 'days_tracked': (end_date - start_date).days + 1,
             },
             'mood': {
-                'average': round(entries.aggregate(avg=Avg('mood_rating'))['avg'] or 0, 2),
-                'highest': entries.aggregate(max=Max('mood_rating'))['max'] or 0,
-                'lowest': entries.aggregate(min=Min('mood_rating'))['min'] or 0,
-                'trend': self.calculate_trend([e.mood_rating for e in entries]),
+                'average': round(totals['avg_mood'] or 0, 2),
+                'highest': totals['max_mood'] or 0,
+                'lowest': totals['min_mood'] or 0,
+                'trend': round(trend, 3) if np.isfinite(trend) else 0,
+                'volatility': round(mood_volatility, 3) if np.isfinite(mood_volatility) else 0,
             },
             'stress': {
-                'average': round(entries.aggregate(avg=Avg('stress_level'))['avg'] or 0, 2),
-                'entries_with_stress': entries.exclude(stress_level__isnull=True).count(),
+                'average': round(totals['avg_stress'] or 0, 2),
+                'entries_with_stress': totals['stress_count'],
             },
             'sleep': {
-                'average': round(entries.aggregate(avg=Avg('sleep_hours'))['avg'] or 0, 2),
-                'entries_with_sleep': entries.exclude(sleep_hours__isnull=True).count(),
+                'average': round(totals['avg_sleep'] or 0, 2),
+                'entries_with_sleep': totals['sleep_count'],
             },
-            'emotions': self.get_emotion_stats(entries),
-            'activities': self.get_activity_stats(entries),
+            'emotions': emotion_stats,
+            'activities': activity_stats,
             'entries': []
         }
         
-        # Add individual entries
-        for entry in entries:
+        # Add individual entries, naming tags from the in-memory catalog
+        catalog = get_catalog()
+        for entry in JournalEntry.with_tags(entries):
             data['entries'].append({
                 'date': entry.date.isoformat(),
                 'mood_rating': entry.mood_rating,
                 'stress_level': entry.stress_level,
                 'sleep_hours': entry.sleep_hours,
                 'notes': entry.notes,
-                'emotions': [e.emotion.name for e in entry.emotions.all()],
-                'activities': [a.activity.name for a in entry.activities.all()],
+                'emotions': catalog.names('emotion', [e.emotion_id for e in entry.emotions.all()]),
+                'activities': catalog.names('activity', [a.activity_id for a in entry.activities.all()]),
             })
         
         return data
     
-    def get_emotion_stats(self, entries):
-        """Get emotion statistics."""
-        emotion_counts = {}
-        for entry in entries:
-            for emotion in entry.emotions.all():
-                emotion_counts[emotion.emotion.name] = emotion_counts.get(emotion.emotion.name, 0) + 1
-        
-        return sorted(emotion_counts.items(), key=lambda x: x[1], reverse=True)
-    
-    def get_activity_stats(self, entries):
-        """Get activity statistics."""
-        activity_counts = {}
-        for entry in entries:
-            for activity in entry.activities.all():
-                activity_counts[activity.activity.name] = activity_counts.get(activity.activity.name, 0) + 1
-        
-        return sorted(activity_counts.items(), key=lambda x: x[1], reverse=True)
-    
-    def calculate_trend(self, values):
-        """Calculate trend using linear regression."""
-        if len(values) < 2:
-            return 0
-        
-        x = list(range(len(values)))
-        n = len(values)
-        
-        sum_x = sum(x)
-        sum_y = sum(values)
-        sum_xy = sum(x[i] * values[i] for i in range(n))
-        sum_x2 = sum(x[i] ** 2 for i in range(n))
-        
-        slope = (n * sum_xy - sum_x * sum_y) / (n * sum_x2 - sum_x ** 2)
-        return round(slope, 3)
-    
     def generate_pdf(self, data, user, start_date, end_date):
         """Generate detailed PDF report using reportlab."""
         from reportlab.lib.pagesizes import letter
@@ -229,6 +205,7 @@ class GenerateReportView(LoginRequiredMixin, View):
             ['Total Entries', str(data['summary']['total_entries']), f"Over {data['summary']['days_tracked']} days"],
             ['Average Mood', f"{data['mood']['average']:.1f}/10", f"Range: {data['mood']['lowest']}-{data['mood']['highest']}"],
             ['Mood Trend', f"{data['mood']['trend']:+.2f}", 'Positive = improving, Negative = declining'],
+            ['Mood Volatility', f"{data['mood'].get('volatility', 0):.2f}", 'Typical change between consecutive entries'],
         ]
         
         if 'stress' in data and data['stress']:
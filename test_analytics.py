@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""
+Tests for the shared analytics module, checked against NumPy and pandas.
+Run with: python test_analytics.py
+"""
+
+import os
+import sys
+import django
+
+# Add the project directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Set up Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mental_health_journal.settings')
+django.setup()
+
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+from analytics import correlation_matrix, pearson, rankdata, rolling_mean, slope, spearman, volatility
+
+
+class AnalyticsTests(SimpleTestCase):
+    """Each statistic matches a reference implementation, including with missing values."""
+    
+    def setUp(self):
+        """Two related series with gaps and ties."""
+        rng = np.random.default_rng(7)
+        self.x = rng.integers(1, 11, 200).astype(float)
+        self.y = self.x * 0.5 + rng.normal(0, 2, 200)
+        self.x[::9] = np.nan
+        self.y[::13] = np.nan
+        self.frame = pd.DataFrame({'x': self.x, 'y': self.y})
+    
+    def test_pearson_uses_pairwise_complete_rows(self):
+        """Rows missing either value are left out, as pandas does."""
+        self.assertAlmostEqual(pearson(self.x, self.y), self.frame['x'].corr(self.frame['y']))
+    
+    def test_spearman_averages_tied_ranks(self):
+        """Ties share their average rank."""
+        self.assertEqual(list(rankdata([3, 1, 3, 2])), [3.5, 1.0, 3.5, 2.0])
+        ranked = self.frame.dropna().rank()
+        self.assertAlmostEqual(spearman(self.x, self.y), ranked['x'].corr(ranked['y']))
+    
+    def test_correlation_matrix_matches_pandas(self):
+        """Every pair of the matrix agrees with pandas' pairwise correlations."""
+        values = np.column_stack([self.x, self.y, self.x - self.y])
+        r, n = correlation_matrix(values)
+        expected = pd.DataFrame(values).corr()
+        np.testing.assert_allclose(r, expected.to_numpy(), atol=1e-9)
+        self.assertEqual(n[0, 1], int((~np.isnan(self.x) & ~np.isnan(self.y)).sum()))
+    
+    def test_correlation_matrix_constant_float_column_is_nan(self):
+        """Rounding noise in a constant column's variance does not become a correlation."""
+        values = np.column_stack([np.full(30, 7.1), np.arange(30.0), np.arange(30.0) ** 2])
+        r, n = correlation_matrix(values)
+        self.assertTrue(np.isnan(r[0]).all())
+        self.assertTrue(np.isnan(r[:, 0]).all())
+        np.testing.assert_allclose(np.diag(r)[1:], [1.0, 1.0])
+        self.assertEqual(n[0, 1], 30)
+    
+    def test_slope_matches_least_squares(self):
+        """The slope against positions equals NumPy's degree-1 fit."""
+        values = np.arange(50) * 0.3 + np.sin(np.arange(50))
+        self.assertAlmostEqual(slope(values), np.polyfit(np.arange(50), values, 1)[0])
+    
+    def test_rolling_mean_skips_missing_values(self):
+        """Full windows average the values they hold."""
+        expected = self.frame['x'].rolling(7, min_periods=1).mean().to_numpy()
+        means = rolling_mean(self.x, 7)
+        self.assertTrue(np.isnan(means[:6]).all())
+        np.testing.assert_allclose(means[6:], expected[6:])
+    
+    def test_volatility_is_spread_of_changes(self):
+        """Volatility is the standard deviation of consecutive differences."""
+        present = self.x[~np.isnan(self.x)]
+        self.assertAlmostEqual(volatility(self.x), np.diff(present).std())
+    
+    def test_undefined_results_are_nan(self):
+        """Too few points or a constant series give NaN rather than an error."""
+        self.assertTrue(np.isnan(pearson([1], [2])))
+        self.assertTrue(np.isnan(pearson([1, 1, 1], [1, 2, 3])))
+        self.assertTrue(np.isnan(spearman([np.nan, 1], [1, 2])))
+        self.assertTrue(np.isnan(slope([5])))
+        self.assertTrue(np.isnan(volatility([np.nan, 4])))
+
+
+def run_tests():
+    """Run all tests."""
+    from django.test.utils import get_runner
+    from django.conf import settings
+    
+    TestRunner = get_runner(settings)
+    test_runner = TestRunner()
+    failures = test_runner.run_tests(["__main__"])
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    run_tests()
@@ -6,7 +6,14 @@ Run with: python test_basic.py
 
 import os
 import sys
+import csv
+import gzip
+import io
+import json
+import tempfile
+import zipfile
 import django
+from unittest import mock
 from django.test import TestCase, Client
 from django.contrib.auth import get_user_model
 from django.urls import reverse
@@ -18,6 +25,20 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mental_health_journal.settings')
 django.setup()
 
+from datetime import timedelta
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from accounts import export
+from accounts.models import ActivityTag, EmotionTag, ExportJob
+from journal.models import DailySummary, EntryEmotion, JournalEntry, LoggingStreak
+from journal import compression
+from journal.charts import downsample_lttb
+from journal.tags import InvalidTagError, set_entry_tags
+from journal.search import reset_backend_cache, search_backend, search_entries
+
 User = get_user_model()
 
 class BasicTests(TestCase):
@@ -91,6 +112,596 @@ class BasicTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, 'Reports')
 
+
+class LoggedInTestCase(TestCase):
+    """A logged-in client for the behaviour tests below."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.client = Client()
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            first_name='Test',
+            last_name='User'
+        )
+        self.client.login(email='test@example.com', password='testpass123')
+    
+    def add_entries(self, count, per_day=1, **fields):
+        """Bulk-create count entries, per_day of them on each day back from today."""
+        today = timezone.now().date()
+        return JournalEntry.objects.bulk_create([
+            JournalEntry(user=self.user, date=today - timedelta(days=i // per_day),
+                         **dict({'mood_rating': i % 11, 'stress_level': (i * 3) % 11, 'sleep_hours': 6 + i % 4}, **fields))
+            for i in range(count)
+        ])
+
+
+class ExportJobTests(LoggedInTestCase):
+    """Export archives are private to their owner, and dead workers never block a new export."""
+    
+    def build_export(self):
+        """Run the export worker against a temporary private storage and return the job."""
+        self.add_entries(3)
+        storage = FileSystemStorage(location=tempfile.mkdtemp())
+        field = ExportJob._meta.get_field('file')
+        self.addCleanup(setattr, field, 'storage', field.storage)
+        field.storage = storage
+        
+        token = self.client.post('/accounts/export-jobs/', {'format': 'zip'}).json()['job']['token']
+        export.run_job(ExportJob.claim_next())
+        return ExportJob.objects.get(token=token)
+    
+    def test_archive_is_stored_privately_under_a_random_name(self):
+        """The storage lives outside MEDIA_ROOT and file names do not contain the owner's email."""
+        location = ExportJob._meta.get_field('file').storage.location
+        self.assertEqual(location, str(settings.EXPORT_ROOT))
+        self.assertFalse(location.startswith(str(settings.MEDIA_ROOT)))
+        
+        job = self.build_export()
+        self.assertEqual(job.status, 'done')
+        self.assertNotIn('test', job.file.name)
+    
+    def test_archive_is_only_served_to_its_owner(self):
+        job = self.build_export()
+        url = f'/accounts/export-jobs/{job.token}/download/'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertIn('entries.csv', archive.namelist())
+        response.close()
+        
+        self.client.logout()
+        self.assertEqual(self.client.get(url).status_code, 302)
+        User.objects.create_user(email='other@example.com', password='testpass123')
+        self.client.login(email='other@example.com', password='testpass123')
+        self.assertEqual(self.client.get(url).status_code, 404)
+    
+    def test_stale_running_job_is_ignored_and_requeued(self):
+        """A job whose worker stopped reporting is not reused, and is put back in the queue."""
+        long_ago = timezone.now() - ExportJob.STALE_AFTER - timedelta(minutes=1)
+        stale = ExportJob.objects.create(user=self.user, status='running', started_at=long_ago, heartbeat_at=long_ago)
+        # Started long ago but still reporting progress
+        live = ExportJob.objects.create(user=self.user, archive_format='tar.gz', status='running',
+                                        started_at=long_ago - timedelta(hours=3), heartbeat_at=timezone.now())
+        
+        response = self.client.post('/accounts/export-jobs/', {'format': 'zip'})
+        self.assertNotEqual(response.json()['job']['token'], str(stale.token))
+        response = self.client.post('/accounts/export-jobs/', {'format': 'tar.gz'})
+        self.assertEqual(response.json()['job']['token'], str(live.token))
+        
+        self.assertEqual(ExportJob.requeue_stale(), 1)
+        stale.refresh_from_db()
+        self.assertEqual((stale.status, stale.started_at, stale.heartbeat_at), ('pending', None, None))
+    
+    def test_worker_that_lost_its_claim_does_not_overwrite_the_job(self):
+        """Once a requeued job is claimed again, the original worker's result is discarded."""
+        self.add_entries(3)
+        self.client.post('/accounts/export-jobs/', {'format': 'zip'})
+        first = ExportJob.claim_next()
+        ExportJob.objects.filter(pk=first.pk).update(heartbeat_at=timezone.now() - ExportJob.STALE_AFTER * 2)
+        ExportJob.requeue_stale()
+        second = ExportJob.claim_next()
+        
+        self.assertFalse(first.finish(status='failed', error='worker restarted'))
+        self.assertTrue(second.finish(status='done', progress=100))
+        second.refresh_from_db()
+        self.assertEqual((second.status, second.error), ('done', ''))
+
+
+class LoggingStreakTests(LoggedInTestCase):
+    """Streaks are updated incrementally and match a full recomputation."""
+    
+    def setUp(self):
+        super().setUp()
+        self.today = timezone.now().date()
+    
+    def log(self, days_ago):
+        """Write an entry the given number of days back and record it."""
+        date = self.today - timedelta(days=days_ago)
+        entry = JournalEntry.objects.create(user=self.user, date=date, mood_rating=5)
+        LoggingStreak.record_entry(self.user, date)
+        return entry
+    
+    def streak(self):
+        """Return (current as of today, longest) from the stored row."""
+        streak = LoggingStreak.objects.get(user=self.user)
+        return streak.current_as_of(self.today), streak.longest_streak
+    
+    def assertMatchesRecompute(self):
+        stored = LoggingStreak.objects.get(user=self.user)
+        fresh = LoggingStreak.recompute(self.user)
+        self.assertEqual(
+            (stored.current_streak, stored.longest_streak, stored.last_entry_date),
+            (fresh.current_streak, fresh.longest_streak, fresh.last_entry_date)
+        )
+    
+    def delete(self, entry):
+        self.client.post(f'/app/entry/{entry.id}/delete/')
+    
+    def test_consecutive_days_extend_the_streak(self):
+        """Each next day adds one; a second entry on the same day adds nothing."""
+        for days_ago in (2, 1, 0, 0):
+            self.log(days_ago)
+        self.assertEqual(self.streak(), (3, 3))
+        self.assertMatchesRecompute()
+    
+    def test_backfilled_day_joins_two_islands(self):
+        """Filling the gap between two runs merges them into one."""
+        for days_ago in (4, 3, 1, 0):
+            self.log(days_ago)
+        self.assertEqual(self.streak(), (2, 2))
+        self.log(2)
+        self.assertEqual(self.streak(), (5, 5))
+        self.assertMatchesRecompute()
+    
+    def test_deleting_a_middle_day_splits_the_streak(self):
+        """Removing the only entry of a day inside a run splits it in two."""
+        entries = [self.log(days_ago) for days_ago in (4, 3, 2, 1, 0)]
+        self.delete(entries[2])
+        self.assertEqual(self.streak(), (2, 2))
+        self.assertMatchesRecompute()
+    
+    def test_deleting_today_ends_the_current_streak(self):
+        """With today's only entry gone the current streak is 0, the longest run stays."""
+        entries = [self.log(days_ago) for days_ago in (2, 1, 0)]
+        self.delete(entries[2])
+        self.assertEqual(self.streak(), (0, 2))
+        self.assertMatchesRecompute()
+    
+    def test_deleting_one_of_two_entries_keeps_the_day(self):
+        """A day still holding an entry keeps the streak intact."""
+        self.log(1)
+        self.log(0)
+        extra = self.log(0)
+        self.delete(extra)
+        self.assertEqual(self.streak(), (2, 2))
+    
+    def test_no_entry_today_means_no_current_streak(self):
+        """A run that ended yesterday reads as 0 today, but still counts as the longest."""
+        for days_ago in (3, 2, 1):
+            self.log(days_ago)
+        self.assertEqual(self.streak(), (0, 3))
+        self.log(0)
+        self.assertEqual(self.streak(), (4, 4))
+
+
+class BatchEntriesTests(LoggedInTestCase):
+    """Offline batches are validated per item, idempotent and applied atomically."""
+    
+    def setUp(self):
+        super().setUp()
+        self.emotion = EmotionTag.objects.create(name='Calm')
+        self.yesterday = (timezone.now().date() - timedelta(days=1)).isoformat()
+    
+    def post_batch(self, items):
+        response = self.client.post('/app/api/entries/batch/', json.dumps({'entries': items}),
+                                    content_type='application/json')
+        return response, response.json()
+    
+    def item(self, key, **fields):
+        return dict({'idempotency_key': key, 'date': self.yesterday, 'mood_rating': 6}, **fields)
+    
+    def test_replaying_a_batch_creates_nothing(self):
+        """A second upload of the same keys reports the stored entries as duplicates."""
+        items = [self.item('a', emotions=[self.emotion.id]), self.item('b', sleep_hours=7.5)]
+        _, first = self.post_batch(items)
+        self.assertEqual(first['created'], 2)
+        
+        _, replay = self.post_batch(items)
+        self.assertEqual(replay['created'], 0)
+        self.assertEqual([r['action'] for r in replay['results']], ['duplicate', 'duplicate'])
+        self.assertEqual([r['entry_id'] for r in replay['results']], [r['entry_id'] for r in first['results']])
+        self.assertEqual(JournalEntry.objects.count(), 2)
+        self.assertEqual(EntryEmotion.objects.count(), 1)
+    
+    def test_duplicate_keys_within_a_batch(self):
+        """A key repeated in one batch is stored once and points back to its first item."""
+        _, payload = self.post_batch([self.item('a'), self.item('a', mood_rating=9)])
+        self.assertEqual(payload['created'], 1)
+        self.assertEqual(payload['results'][1]['action'], 'duplicate')
+        self.assertEqual(payload['results'][1]['duplicate_of'], 0)
+        self.assertEqual(JournalEntry.objects.get().mood_rating, 6)
+    
+    def test_invalid_items_are_reported_without_failing_the_batch(self):
+        """Each bad item gets its own error while the valid ones are stored."""
+        future = (timezone.now().date() + timedelta(days=5)).isoformat()
+        items = [
+            self.item('ok'),
+            self.item('mood', mood_rating=11),
+            self.item('date', date=future),
+            self.item('tag', emotions=[999]),
+            {'date': self.yesterday, 'mood_rating': 5},
+        ]
+        response, payload = self.post_batch(items)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['success'] for r in payload['results']], [True, False, False, False, False])
+        self.assertIn('mood_rating', payload['results'][1]['error'])
+        self.assertIn('future', payload['results'][2]['error'])
+        self.assertIn('999', payload['results'][3]['error'])
+        self.assertIn('idempotency_key', payload['results'][4]['error'])
+        self.assertEqual(list(JournalEntry.objects.values_list('idempotency_key', flat=True)), ['ok'])
+    
+    def test_failure_rolls_back_the_whole_batch(self):
+        """If any write fails, no entry, tag link or rollup row of the batch is kept."""
+        with mock.patch('journal.ingest.bump_data_version', side_effect=IntegrityError):
+            response, _ = self.post_batch([self.item('a', emotions=[self.emotion.id]), self.item('b')])
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(JournalEntry.objects.exists())
+        self.assertFalse(EntryEmotion.objects.exists())
+        self.assertFalse(DailySummary.objects.exists())
+        
+        _, payload = self.post_batch([self.item('a'), self.item('b')])
+        self.assertEqual(payload['created'], 2)
+
+
+class SyncTests(LoggedInTestCase):
+    """Delta sync returns exactly what changed after the client's watermark."""
+    
+    def sync(self, since=None, limit=None):
+        params = {key: value for key, value in (('since', since), ('limit', limit)) if value is not None}
+        response = self.client.get('/app/api/sync/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+    
+    def test_round_trip_returns_edits_and_tombstones(self):
+        """After a full sync, the next sync holds only the edited entry and the deleted one."""
+        today = timezone.now().date()
+        entries = [JournalEntry.objects.create(user=self.user, date=today - timedelta(days=i), mood_rating=5)
+                   for i in range(3)]
+        JournalEntry.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        
+        full = self.sync()
+        self.assertEqual({entry['id'] for entry in full['entries']}, {entry.id for entry in entries})
+        self.assertEqual(full['deleted'], [])
+        
+        edited, deleted, untouched = entries
+        self.client.post(f'/app/entry/{edited.id}/edit/', json.dumps({'mood_rating': 9}), content_type='application/json')
+        self.client.post(f'/app/entry/{deleted.id}/delete/')
+        
+        delta = self.sync(full['watermark'])
+        self.assertEqual([(entry['id'], entry['mood_rating']) for entry in delta['entries']], [(edited.id, 9)])
+        self.assertEqual([tombstone['id'] for tombstone in delta['deleted']], [deleted.id])
+        self.assertFalse(delta['has_more'])
+        
+        # The watermark never moves backwards, and nothing older comes back
+        self.assertGreaterEqual(delta['watermark'], full['watermark'])
+        self.assertNotIn(untouched.id, [entry['id'] for entry in self.sync(delta['watermark'])['entries']])
+    
+    def test_full_pages_resume_from_their_cut(self):
+        """Small pages walk through every change exactly once."""
+        start = timezone.now() - timedelta(hours=1)
+        for i in range(5):
+            entry = JournalEntry.objects.create(user=self.user, date=start.date() - timedelta(days=i), mood_rating=5)
+            JournalEntry.objects.filter(id=entry.id).update(updated_at=start + timedelta(minutes=i))
+        
+        seen, since = [], None
+        while True:
+            page = self.sync(since, limit=2)
+            seen.extend(entry['id'] for entry in page['entries'])
+            since = page['watermark']
+            if not page['has_more']:
+                break
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+
+
+class SearchTests(LoggedInTestCase):
+    """The FTS5 shadow table follows entry writes and ranks the user's matches."""
+    
+    def setUp(self):
+        super().setUp()
+        reset_backend_cache()
+        if search_backend() != 'sqlite':
+            self.skipTest('SQLite FTS5 is not available')
+    
+    def add(self, notes, days_ago=0, user=None):
+        return JournalEntry.objects.create(user=user or self.user, date=timezone.now().date() - timedelta(days=days_ago),
+                                           mood_rating=5, notes=notes)
+    
+    def ids(self, query):
+        return [hit.id for hit in search_entries(self.user, query)]
+    
+    def test_index_follows_insert_update_and_delete(self):
+        """New, edited and deleted notes are found, re-found and dropped."""
+        entry = self.add('Long walk by the river')
+        self.assertEqual(self.ids('river'), [entry.id])
+        
+        entry.notes = 'Quiet evening reading'
+        entry.save()
+        self.assertEqual(self.ids('river'), [])
+        self.assertEqual(self.ids('reading'), [entry.id])
+        
+        entry.delete()
+        self.assertEqual(self.ids('reading'), [])
+    
+    def test_results_ranked_and_limited_to_the_user(self):
+        """Denser matches rank first and other users' entries never appear."""
+        other = User.objects.create_user(email='other@example.com', password='testpass123')
+        self.add('anxious anxious anxious before the exam', user=other)
+        weak = self.add('Slept badly. Work was long, the commute was long and I felt a bit anxious at the end of it', days_ago=1)
+        strong = self.add('Anxious morning, anxious afternoon', days_ago=2)
+        self.assertEqual(self.ids('anxious'), [strong.id, weak.id])
+        self.assertEqual(self.ids('anx'), [strong.id, weak.id])
+    
+    def test_other_users_entries_do_not_take_up_the_limit(self):
+        """The match is scoped to the user, so a busy neighbour cannot crowd out results."""
+        other = User.objects.create_user(email='other@example.com', password='testpass123')
+        for _ in range(5):
+            self.add('journal journal journal', user=other)
+        mine = [self.add('journal', days_ago=i) for i in range(3)]
+        self.assertEqual([hit.id for hit in search_entries(self.user, 'journal', limit=2)], [mine[2].id, mine[1].id])
+        self.assertEqual(self.ids('journal'), [entry.id for entry in reversed(mine)])
+        self.assertNotIn(f'u{self.user.pk}', search_entries(self.user, 'journal')[0].snippet)
+    
+    def test_history_shows_escaped_highlighted_snippets(self):
+        """The history page keeps rank order and marks the match inside escaped text."""
+        self.add('<b>Therapy</b> session went well')
+        response = self.client.get('/app/history/', {'search': 'therapy'})
+        entry = response.context['entries'][0]
+        self.assertIn('<mark>Therapy</mark>', entry.search_snippet)
+        self.assertIn('&lt;b&gt;', entry.search_snippet)
+        self.assertNotIn('<b>', entry.search_snippet)
+    
+    def test_query_syntax_is_treated_as_text(self):
+        """FTS5 operators in the query are searched for, never parsed."""
+        entry = self.add('Ran near the lake')
+        self.assertEqual(self.ids('"lake'), [entry.id])
+        self.assertEqual(self.ids('ran: (lake*'), [entry.id])
+        self.assertEqual(self.ids('"*'), [])
+
+
+class EntriesAPITests(LoggedInTestCase):
+    """Keyset pages and streams cover the range exactly once, in (date, id) order."""
+    
+    def setUp(self):
+        super().setUp()
+        # Three entries a day, so page boundaries fall between rows sharing a date
+        self.add_entries(47, per_day=3)
+        self.expected = list(JournalEntry.objects.order_by('date', 'id').values_list('id', flat=True))
+    
+    def test_pages_have_no_duplicates_or_gaps(self):
+        """Following next_cursor with a small limit visits every entry once."""
+        seen, cursor = [], None
+        while True:
+            params = {'days': 30, 'limit': 5}
+            if cursor:
+                params['cursor'] = cursor
+            payload = self.client.get('/app/api/entries/', params).json()
+            self.assertLessEqual(len(payload['entries']), 5)
+            seen.extend(entry['id'] for entry in payload['entries'])
+            cursor = payload['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(seen, self.expected)
+    
+    def test_streams_match_the_pages(self):
+        """The streamed JSON document and NDJSON lines hold the same entries."""
+        response = self.client.get('/app/api/entries/', {'days': 30, 'limit': 4, 'stream': 1})
+        self.assertTrue(response.streaming)
+        document = json.loads(b''.join(response.streaming_content))
+        self.assertEqual([entry['id'] for entry in document['entries']], self.expected)
+        
+        response = self.client.get('/app/api/entries/', {'days': 30, 'limit': 4, 'format': 'ndjson'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], self.expected)
+    
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get('/app/api/entries/', {'cursor': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ChartSeriesTests(LoggedInTestCase):
+    """Chart points are aggregated in the database and downsampled with LTTB."""
+    
+    def test_lttb_keeps_endpoints_and_budget(self):
+        """The result has exactly max_points points, starting and ending with the originals."""
+        points = [(x, (x * 7) % 13) for x in range(1000)]
+        for max_points in (3, 10, 99):
+            sampled = downsample_lttb(points, max_points, x=lambda p: p[0], y=lambda p: p[1])
+            self.assertEqual(len(sampled), max_points)
+            self.assertEqual((sampled[0], sampled[-1]), (points[0], points[-1]))
+            self.assertEqual(sampled, sorted(sampled))
+        self.assertEqual(downsample_lttb(points[:5], 10, x=lambda p: p[0], y=lambda p: p[1]), points[:5])
+        self.assertEqual(len(downsample_lttb(points, 2, x=lambda p: p[0], y=lambda p: p[1])), 2)
+    
+    def test_lttb_keeps_a_spike(self):
+        """A lone peak survives downsampling where uniform sampling would drop it."""
+        points = [(x, 100 if x == 503 else 0) for x in range(1000)]
+        sampled = downsample_lttb(points, 20, x=lambda p: p[0], y=lambda p: p[1])
+        self.assertIn((503, 100), sampled)
+    
+    def test_weekly_buckets_aggregate_every_entry(self):
+        """Bucket counts add up to the entries in range and means match the raw data."""
+        self.add_entries(60)
+        payload = self.client.get('/app/api/entries/', {'days': 90, 'bucket': 'week'}).json()
+        buckets = payload['buckets']
+        self.assertEqual(payload['bucket'], 'week')
+        self.assertEqual(sum(row['count'] for row in buckets), 60)
+        self.assertEqual([row['date'] for row in buckets], sorted(row['date'] for row in buckets))
+        
+        first = buckets[0]
+        week = JournalEntry.objects.filter(date__gte=first['date'], date__lt=buckets[1]['date'])
+        moods = list(week.values_list('mood_rating', flat=True))
+        self.assertEqual(first['count'], len(moods))
+        self.assertAlmostEqual(first['mood_mean'], sum(moods) / len(moods), places=2)
+        self.assertEqual(first['mood_max'], max(moods))
+    
+    def test_max_points_downsamples_daily_buckets(self):
+        """max_points alone implies daily buckets and caps the number returned."""
+        self.add_entries(200)
+        buckets = self.client.get('/app/api/entries/', {'days': 365, 'max_points': 25}).json()['buckets']
+        self.assertEqual(len(buckets), 25)
+        today = timezone.now().date()
+        self.assertEqual(buckets[-1]['date'], today.isoformat())
+        self.assertEqual(buckets[0]['date'], (today - timedelta(days=199)).isoformat())
+        
+        response = self.client.get('/app/api/entries/', {'bucket': 'year'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ColumnarAndCompressionTests(LoggedInTestCase):
+    """Columnar payloads carry the same data, and responses honour Accept-Encoding."""
+    
+    def setUp(self):
+        super().setUp()
+        entries = self.add_entries(40)
+        calm = EmotionTag.objects.create(name='Calm')
+        walking = ActivityTag.objects.create(name='Walking')
+        EntryEmotion.objects.bulk_create([EntryEmotion(entry=entry, emotion=calm) for entry in entries[::2]])
+        for entry in entries[::3]:
+            entry.activities.create(activity=walking)
+    
+    def test_columnar_matches_row_payload(self):
+        """Every column lines up with the row-per-entry JSON, tags included."""
+        rows = self.client.get('/app/api/entries/', {'limit': 1000}).json()['entries']
+        columns = self.client.get('/app/api/entries/', {'limit': 1000, 'format': 'columnar'}).json()
+        self.assertEqual(columns['ids'], [row['id'] for row in rows])
+        self.assertEqual(columns['mood'], [row['mood_rating'] for row in rows])
+        self.assertEqual(columns['sleep'], [row['sleep_hours'] for row in rows])
+        names = columns['tags']['emotions']
+        self.assertEqual([[names[i] for i in tags] for tags in columns['emotions']], [row['emotions'] for row in rows])
+        self.assertIsNone(columns['next_cursor'])
+    
+    def test_gzip_negotiation(self):
+        """gzip is applied when accepted, refused with q=0, and Vary is always set."""
+        plain = self.client.get('/app/api/entries/')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', plain['Vary'])
+        
+        compressed = self.client.get('/app/api/entries/', HTTP_ACCEPT_ENCODING='br;q=0.5, gzip')
+        expected = 'br' if compression.brotli is not None else 'gzip'
+        self.assertEqual(compressed['Content-Encoding'], expected)
+        self.assertIn('Accept-Encoding', compressed['Vary'])
+        if expected == 'gzip':
+            self.assertEqual(json.loads(gzip.decompress(compressed.content)), plain.json())
+        
+        refused = self.client.get('/app/api/entries/', HTTP_ACCEPT_ENCODING='gzip;q=0, identity')
+        self.assertFalse(refused.has_header('Content-Encoding'))
+    
+    def test_small_and_streamed_bodies(self):
+        """Tiny bodies are sent as they are; streams are compressed chunk by chunk."""
+        response = self.client.get('/app/api/entries/', {'days': 0, 'limit': 1}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        
+        response = self.client.get('/app/api/entries/', {'stream': 1}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+        document = json.loads(gzip.decompress(b''.join(response.streaming_content)))
+        self.assertEqual(len(document['entries']), 31)
+
+
+class EntryTagTests(LoggedInTestCase):
+    """Tag edits write only the links that changed."""
+    
+    def setUp(self):
+        super().setUp()
+        self.entry = JournalEntry.objects.create(user=self.user, date=timezone.now().date(), mood_rating=5)
+        self.emotions = [EmotionTag.objects.create(name=name).id for name in ('Calm', 'Happy', 'Tired')]
+        self.activity = ActivityTag.objects.create(name='Walking').id
+        set_entry_tags(self.entry, self.emotions[:2], [self.activity], is_new=True)
+    
+    def writes(self, *args):
+        """Apply a tag change and return the SQL statements that modified rows."""
+        with CaptureQueriesContext(connection) as queries:
+            set_entry_tags(self.entry, *args)
+        return [q['sql'].split()[0] for q in queries.captured_queries if q['sql'].split()[0] in ('INSERT', 'UPDATE', 'DELETE')]
+    
+    def emotion_links(self):
+        return dict(EntryEmotion.objects.filter(entry=self.entry).values_list('emotion_id', 'id'))
+    
+    def test_unchanged_tags_write_nothing(self):
+        self.assertEqual(self.writes(self.emotions[:2], [self.activity]), [])
+    
+    def test_diff_keeps_surviving_links(self):
+        """Swapping one emotion deletes one link, inserts one and keeps the other row."""
+        before = self.emotion_links()
+        self.assertEqual(self.writes([self.emotions[1], self.emotions[2]], None), ['DELETE', 'INSERT'])
+        after = self.emotion_links()
+        self.assertEqual(set(after), {self.emotions[1], self.emotions[2]})
+        self.assertEqual(after[self.emotions[1]], before[self.emotions[1]])
+        self.assertEqual(self.entry.activities.count(), 1)
+    
+    def test_unknown_ids_write_nothing(self):
+        """An unknown id rejects the whole change before any row is touched."""
+        with self.assertRaises(InvalidTagError):
+            set_entry_tags(self.entry, [self.emotions[2], 999], [])
+        self.assertEqual(set(self.emotion_links()), set(self.emotions[:2]))
+        self.assertEqual(self.entry.activities.count(), 1)
+    
+    def test_edit_view_applies_the_diff(self):
+        """The edit endpoint replaces tags through the same diff."""
+        response = self.client.post(f'/app/entry/{self.entry.id}/edit/', json.dumps({
+            'mood_rating': 6, 'emotions': [str(self.emotions[2])], 'activities': [],
+        }), content_type='application/json')
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(set(self.emotion_links()), {self.emotions[2]})
+        self.assertEqual(self.entry.activities.count(), 0)
+
+
+class DataExportTests(LoggedInTestCase):
+    """Streamed exports are complete, well-formed documents."""
+    
+    def setUp(self):
+        super().setUp()
+        self.add_entries(25, notes='Said "hi", then\nwent home')
+        calm = EmotionTag.objects.create(name='Calm')
+        EntryEmotion.objects.create(entry=JournalEntry.objects.first(), emotion=calm)
+    
+    def download(self, format_type):
+        response = self.client.get('/accounts/export-data/', {'format': format_type})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment;', response['Content-Disposition'])
+        return b''.join(response.streaming_content).decode()
+    
+    def test_json_export_is_valid(self):
+        document = json.loads(self.download('json'))
+        self.assertEqual(document['user']['email'], 'test@example.com')
+        self.assertIn('reminder_enabled', document['settings'])
+        self.assertEqual(len(document['entries']), 25)
+        self.assertEqual(document['entries'][0]['notes'], 'Said "hi", then\nwent home')
+        self.assertEqual(sum(entry['emotions'] == ['Calm'] for entry in document['entries']), 1)
+    
+    def test_csv_export_round_trips(self):
+        """Quotes, commas and newlines in notes survive the CSV quoting."""
+        rows = list(csv.reader(io.StringIO(self.download('csv'))))
+        self.assertEqual(rows[0], export.CSV_HEADER)
+        self.assertEqual(len(rows), 26)
+        self.assertEqual({row[5] for row in rows[1:]}, {'Said "hi", then\nwent home'})
+    
+    def test_ndjson_and_small_chunks_match(self):
+        """Each NDJSON line is one entry, and chunking never drops or repeats one."""
+        lines = self.download('ndjson').splitlines()
+        self.assertEqual(len(lines), 25)
+        user = User.objects.get(pk=self.user.pk)
+        chunked = json.loads(''.join(export.json_document(user, chunk_size=4)))
+        self.assertEqual(chunked['entries'], [json.loads(line) for line in lines])
+    
+    def test_unknown_format_is_rejected(self):
+        self.assertEqual(self.client.get('/accounts/export-data/', {'format': 'xml'}).status_code, 400)
+
+
 def run_tests():
     """Run all tests."""
     print("Running basic tests for Mental Health Journal...")
@@ -0,0 +1,500 @@
+#!/usr/bin/env python
+"""
+Query-count tests for the hot pages of the Mental Health Journal.
+Run with: python test_queries.py
+"""
+
+import os
+import sys
+import django
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+
+# Add the project directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Set up Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mental_health_journal.settings')
+django.setup()
+
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.db.models import Avg
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from accounts.models import EmotionTag, ActivityTag
+from journal.models import JournalEntry, DailySummary, DailyPrompt, LoggingStreak, MetricPrefix, EntryEmotion, EntryActivity
+from insights.models import Correlation, Insight, InsightJob
+from journal.caching import bump_data_version
+from journal import prompts
+from journal.prompts import active_prompts
+from accounts import catalog
+from accounts.catalog import get_catalog
+
+User = get_user_model()
+
+# Session, user with settings, rollup, entries + 2 tag prefetches, streak, shared generations
+MAX_DASHBOARD_QUERIES = 8
+
+
+class QueryCountTestCase(TestCase):
+    """Shared user and history fixtures for the query-count tests."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.client = Client()
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            first_name='Test',
+            last_name='User'
+        )
+        self.emotion = EmotionTag.objects.create(name='Calm')
+        self.activity = ActivityTag.objects.create(name='Walking')
+        self.client.login(email='test@example.com', password='testpass123')
+        # The prompt rotation and tag catalog are loaded once per process, not per request
+        active_prompts()
+        get_catalog()
+    
+    def create_entries(self, count):
+        """Spread count entries over the days leading up to today."""
+        today = timezone.now().date()
+        entries = JournalEntry.objects.bulk_create([
+            JournalEntry(user=self.user, date=today - timedelta(days=i % 400), mood_rating=i % 11,
+                         stress_level=(i * 3) % 11, sleep_hours=6 + (i % 4))
+            for i in range(count)
+        ])
+        EntryEmotion.objects.bulk_create([EntryEmotion(entry=e, emotion=self.emotion) for e in entries])
+        EntryActivity.objects.bulk_create([EntryActivity(entry=e, activity=self.activity) for e in entries])
+        DailySummary.rebuild_for_user(self.user)
+        LoggingStreak.recompute(self.user)
+        bump_data_version(self.user.id)
+
+
+class DashboardQueryTests(QueryCountTestCase):
+    """The dashboard must cost the same number of queries regardless of history size."""
+    
+    def count_dashboard_queries(self):
+        """Render the dashboard and return the number of queries it issued."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/app/')
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+    
+    def test_dashboard_queries_with_one_entry(self):
+        """Dashboard stays under the query budget with a single entry."""
+        self.create_entries(1)
+        self.assertLessEqual(self.count_dashboard_queries(), MAX_DASHBOARD_QUERIES)
+    
+    def test_dashboard_queries_constant_with_large_history(self):
+        """Dashboard issues the same queries for 1 and 10,000 entries."""
+        self.create_entries(1)
+        small = self.count_dashboard_queries()
+        
+        JournalEntry.objects.all().delete()
+        self.create_entries(10000)
+        large = self.count_dashboard_queries()
+        
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, MAX_DASHBOARD_QUERIES)
+    
+    def test_dashboard_without_rollup_uses_grouped_query(self):
+        """Without rollup rows the dashboard falls back to one grouped aggregate."""
+        self.create_entries(500)
+        DailySummary.objects.all().delete()
+        self.assertLessEqual(self.count_dashboard_queries(), MAX_DASHBOARD_QUERIES + 1)
+    
+    def test_bootstrap_api_queries_constant_with_large_history(self):
+        """The bootstrap endpoint costs the same for 10 and 10,000 entries, and less once cached."""
+        counts = []
+        for size in (10, 10000):
+            JournalEntry.objects.all().delete()
+            self.create_entries(size)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get('/app/api/dashboard/')
+            self.assertEqual(response.status_code, 200)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertLessEqual(counts[1], MAX_DASHBOARD_QUERIES)
+        
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/app/api/dashboard/')
+        self.assertLess(len(queries), counts[1])
+
+
+class DailySummaryTests(QueryCountTestCase):
+    """The rollup written on each edit and delete equals a fresh aggregate of the entries."""
+    
+    def assertRollupMatchesEntries(self):
+        fields = list(DailySummary.entry_aggregates())
+        stored = {row.pop('date'): row for row in DailySummary.objects.filter(user=self.user).values('date', *fields)}
+        fresh = {
+            row.pop('date'): DailySummary.from_aggregate_row(self.user, row)
+            for row in JournalEntry.objects.filter(user=self.user).order_by().values('date')
+            .annotate(**DailySummary.entry_aggregates())
+        }
+        self.assertEqual(stored.keys(), fresh.keys())
+        for day, row in stored.items():
+            self.assertEqual(row, {field: getattr(fresh[day], field) for field in fields}, day)
+    
+    def test_rollup_follows_edits(self):
+        """Changing and clearing an entry's values updates its day's sums, counts and extremes."""
+        self.create_entries(20)
+        entry = JournalEntry.objects.filter(user=self.user).order_by('date').first()
+        JournalEntry.objects.create(user=self.user, date=entry.date, mood_rating=1, stress_level=9)
+        DailySummary.refresh(self.user, [entry.date])
+        
+        response = self.client.post(f'/app/entry/{entry.id}/edit/', '{"mood_rating": 10, "stress_level": 0}',
+                                    content_type='application/json')
+        self.assertTrue(response.json()['success'])
+        summary = DailySummary.objects.get(user=self.user, date=entry.date)
+        self.assertEqual((summary.mood_max, summary.stress_min, summary.sleep_count), (10, 0, 0))
+        self.assertRollupMatchesEntries()
+    
+    def test_rollup_follows_deletes(self):
+        """Deleting a day's last entry removes the day's row; deleting one of several updates it."""
+        self.create_entries(3)
+        today = timezone.now().date()
+        JournalEntry.objects.create(user=self.user, date=today, mood_rating=2)
+        DailySummary.refresh(self.user, [today])
+        
+        lonely = JournalEntry.objects.get(user=self.user, date=today - timedelta(days=1))
+        self.client.post(f'/app/entry/{lonely.id}/delete/')
+        self.assertFalse(DailySummary.objects.filter(user=self.user, date=lonely.date).exists())
+        
+        shared = JournalEntry.objects.filter(user=self.user, date=today).first()
+        self.client.post(f'/app/entry/{shared.id}/delete/')
+        self.assertEqual(DailySummary.objects.get(user=self.user, date=today).entry_count, 1)
+        self.assertRollupMatchesEntries()
+
+
+class StatsQueryTests(QueryCountTestCase):
+    """The stats endpoint reports the rollup's totals and is served from cache until a write."""
+    
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.create_entries(60)
+        # A second, less frequent emotion so the ranking has something to order
+        tired = EmotionTag.objects.create(name='Tired')
+        entries = JournalEntry.objects.filter(user=self.user, mood_rating__lt=4)
+        EntryEmotion.objects.bulk_create([EntryEmotion(entry=entry, emotion=tired) for entry in entries])
+        bump_data_version(self.user.id)
+    
+    def test_payload_matches_rollup_and_tag_counts(self):
+        """Window averages come from DailySummary and top tags from count_tags, and both match the entries."""
+        start_date = timezone.now().date() - timedelta(days=30)
+        payload = self.client.get('/app/api/stats/?days=30').json()
+        
+        totals = DailySummary.window_totals(self.user, start_date)
+        top_emotions, top_activities = JournalEntry.count_tags(self.user.entries.filter(date__gte=start_date), limit=5)
+        self.assertEqual(payload['total_entries'], totals['entry_count'])
+        self.assertEqual(payload['avg_mood'], round(totals['avg_mood'], 2))
+        self.assertEqual(payload['avg_sleep'], round(totals['avg_sleep'], 2))
+        self.assertEqual(payload['top_emotions'], [list(pair) for pair in top_emotions])
+        self.assertEqual(payload['top_activities'], [list(pair) for pair in top_activities])
+        
+        entries = JournalEntry.objects.filter(user=self.user, date__gte=start_date)
+        fresh = entries.aggregate(mood=Avg('mood_rating'))
+        self.assertEqual(payload['total_entries'], entries.count())
+        self.assertEqual(payload['avg_mood'], round(fresh['mood'], 2))
+        self.assertEqual(payload['top_emotions'][0], ['Calm', entries.count()])
+        self.assertEqual(payload['top_emotions'][1], ['Tired', entries.filter(mood_rating__lt=4).count()])
+    
+    def test_second_call_is_cached_until_a_write(self):
+        """A repeat costs only session, user and generation reads; an entry edit recomputes."""
+        first = self.client.get('/app/api/stats/?days=30').json()
+        with self.assertNumQueries(3):
+            self.assertEqual(self.client.get('/app/api/stats/?days=30').json(), first)
+        
+        entry = JournalEntry.objects.filter(user=self.user, mood_rating=0).first()
+        self.client.post(f'/app/entry/{entry.id}/edit/', '{"mood_rating": 10}', content_type='application/json')
+        with CaptureQueriesContext(connection) as queries:
+            after = self.client.get('/app/api/stats/?days=30').json()
+        self.assertTrue([q for q in queries.captured_queries if 'journal_dailysummary' in q['sql']])
+        self.assertGreater(after['avg_mood'], first['avg_mood'])
+
+
+class HistoryQueryTests(QueryCountTestCase):
+    """Deep history pages must cost the same as the first page."""
+    
+    def get_history(self, query=''):
+        """Render a history page and return (response, query count)."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/app/history/' + ('?' + query if query else ''))
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+    
+    def test_history_pages_cost_the_same_deep_in_history(self):
+        """Paging older keeps a constant query count and never repeats an entry."""
+        self.create_entries(200)
+        response, first = self.get_history()
+        seen = [entry.id for entry in response.context['entries']]
+        
+        while response.context['older_query']:
+            response, count = self.get_history(response.context['older_query'])
+            self.assertEqual(count, first)
+            seen.extend(entry.id for entry in response.context['entries'])
+        
+        self.assertEqual(len(seen), 200)
+        self.assertEqual(len(set(seen)), 200)
+    
+    def test_history_newer_link_returns_previous_page(self):
+        """Following older then newer lands back on the first page."""
+        self.create_entries(50)
+        first, _ = self.get_history()
+        older, _ = self.get_history(first.context['older_query'])
+        newer, _ = self.get_history(older.context['newer_query'])
+        self.assertEqual(
+            [entry.id for entry in newer.context['entries']],
+            [entry.id for entry in first.context['entries']]
+        )
+        self.assertIsNone(first.context['newer_query'])
+
+
+class ConditionalRequestTests(QueryCountTestCase):
+    """Revalidating unchanged data answers 304 without reading the journal tables."""
+    
+    urls = ['/app/', '/app/api/entries/', '/app/api/stats/', '/insights/api/correlations/']
+    
+    def test_unchanged_data_returns_304_without_entry_queries(self):
+        """A matching If-None-Match is answered before the view runs."""
+        self.create_entries(30)
+        for url in self.urls:
+            etag = self.client.get(url)['ETag']
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304, url)
+            self.assertFalse([q for q in queries.captured_queries if 'journal_' in q['sql']], url)
+    
+    def test_write_changes_etag(self):
+        """Adding an entry bumps the data version and so every ETag."""
+        self.create_entries(5)
+        etag = self.client.get('/app/api/stats/')['ETag']
+        self.client.post('/app/api/quick-add/', '{"mood_rating": 6}', content_type='application/json')
+        response = self.client.get('/app/api/stats/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class SharedGenerationTests(QueryCountTestCase):
+    """A tag or prompt change made by one worker is seen by every other worker."""
+    
+    def test_stale_process_reloads_after_tag_change(self):
+        """A snapshot loaded before the change is replaced on the next lookup."""
+        stale = catalog._catalog
+        running = ActivityTag.objects.create(name='Running')
+        catalog._catalog = stale  # Another worker still holds the old snapshot
+        self.assertIn(running.id, get_catalog().activities)
+        
+        stale = catalog._catalog
+        running.delete()
+        catalog._catalog = stale
+        self.assertNotIn(running.id, get_catalog().activities)
+    
+    def test_stale_process_reloads_after_prompt_change(self):
+        """A new prompt joins the rotation, and the dashboard ETag, in every process."""
+        self.create_entries(5)
+        etag = self.client.get('/app/api/dashboard/')['ETag']
+        stale = prompts._active_prompts
+        prompt = DailyPrompt.objects.create(text='What surprised you today?')
+        prompts._active_prompts = stale  # Another worker still holds the old rotation
+        self.assertIn(prompt, active_prompts())
+        self.assertEqual(self.client.get('/app/api/dashboard/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+    
+    def test_tag_rename_changes_etag_and_cached_stats(self):
+        """Renaming a tag bumps the catalog, so neither the ETag nor the cached stats are reused."""
+        cache.clear()
+        self.create_entries(5)
+        response = self.client.get('/app/api/stats/')
+        self.assertEqual(response.json()['top_emotions'], [['Calm', 5]])
+        
+        self.emotion.name = 'Serene'
+        self.emotion.save()
+        response = self.client.get('/app/api/stats/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['top_emotions'], [['Serene', 5]])
+    
+    def test_generations_read_once_per_request(self):
+        """Every catalog and prompt lookup in a request shares one generation query."""
+        self.create_entries(5)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/app/')
+        generation_queries = [q for q in queries.captured_queries if 'accounts_cachegeneration' in q['sql']]
+        self.assertEqual(len(generation_queries), 1)
+
+
+class CorrelationQueryTests(QueryCountTestCase):
+    """The correlations endpoint reads its window with one query, whatever its size."""
+    
+    def get_correlations(self):
+        """Fetch 400 days of correlations and return (payload, query count)."""
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/insights/api/correlations/?days=400')
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(queries)
+    
+    def test_correlation_queries_constant_with_large_history(self):
+        """10 and 2,000 entries cost the same number of queries."""
+        self.create_entries(10)
+        _, small = self.get_correlations()
+        JournalEntry.objects.all().delete()
+        self.create_entries(2000)
+        _, large = self.get_correlations()
+        self.assertEqual(small, large)
+    
+    def test_correlations_skip_missing_values_pairwise(self):
+        """Missing sleep is left out of its pairs only, and each pair is reported once."""
+        self.create_entries(60)
+        JournalEntry.objects.filter(mood_rating__lt=3).update(sleep_hours=None)
+        payload, _ = self.get_correlations()
+        correlations = payload['correlations']
+        
+        rows = JournalEntry.objects.values_list('mood_rating', 'stress_level', 'sleep_hours')
+        frame = pd.DataFrame(list(rows), columns=['mood_rating', 'stress_level', 'sleep_hours'], dtype=float)
+        expected = frame.corr()
+        self.assertAlmostEqual(correlations['mood_rating_vs_sleep_hours']['correlation'], expected.loc['mood_rating', 'sleep_hours'], places=3)
+        self.assertAlmostEqual(correlations['stress_level_vs_sleep_hours']['correlation'], expected.loc['stress_level', 'sleep_hours'], places=3)
+        self.assertEqual(correlations['mood_rating_vs_sleep_hours']['sample_size'], frame['sleep_hours'].notna().sum())
+        self.assertEqual(correlations['mood_rating_vs_stress_level']['sample_size'], 60)
+        self.assertNotIn('sleep_hours_vs_mood_rating', correlations)
+
+
+class MetricPrefixTests(QueryCountTestCase):
+    """Window statistics come from two prefix rows and match a direct computation."""
+    
+    def setUp(self):
+        super().setUp()
+        self.create_entries(900)
+        JournalEntry.objects.filter(mood_rating__lt=3).update(sleep_hours=None)
+        MetricPrefix.rebuild_for_user(self.user)
+    
+    def test_windows_match_direct_computation(self):
+        """Correlations, means and trends agree with NumPy for every insights window."""
+        today = timezone.now().date()
+        for days in (7, 30, 90, 365):
+            start_date = today - timedelta(days=days)
+            with CaptureQueriesContext(connection) as queries:
+                window = MetricPrefix.window(self.user, start_date, today)
+            self.assertEqual(len(queries), 2)
+            
+            rows = JournalEntry.objects.filter(user=self.user, date__gte=start_date).values_list('date', 'mood_rating', 'sleep_hours')
+            both = [(mood, sleep) for _, mood, sleep in rows if sleep is not None]
+            moods = [mood for _, mood, _ in rows]
+            days_since = [(date - MetricPrefix.EPOCH).days for date, _, _ in rows]
+            
+            self.assertEqual(window.count('mood_rating', 'sleep_hours'), len(both))
+            self.assertAlmostEqual(window.correlation('mood_rating', 'sleep_hours'), np.corrcoef(np.array(both).T)[0, 1])
+            self.assertAlmostEqual(window.mean('mood_rating'), np.mean(moods))
+            self.assertAlmostEqual(window.slope('mood_rating'), np.polyfit(days_since, moods, 1)[0])
+    
+    def test_backdated_write_updates_later_windows(self):
+        """An edit to an old day shifts every window that covers it."""
+        today = timezone.now().date()
+        start_date = today - timedelta(days=30)
+        before = MetricPrefix.window(self.user, start_date, today).mean('mood_rating')
+        
+        entry = JournalEntry.objects.filter(user=self.user, date=today - timedelta(days=20)).first()
+        self.client.post(f'/app/entry/{entry.id}/edit/', '{"mood_rating": 10}', content_type='application/json')
+        
+        after = MetricPrefix.window(self.user, start_date, today)
+        mean = JournalEntry.objects.filter(user=self.user, date__gte=start_date).aggregate(mood=Avg('mood_rating'))['mood']
+        self.assertNotEqual(before, after.mean('mood_rating'))
+        self.assertAlmostEqual(after.mean('mood_rating'), mean)
+    
+    def test_insights_page_computes_correlations_without_writing(self):
+        """The insights page reads the prefix store once per data version and stores nothing."""
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/insights/?days=30')
+        correlations = list(response.context['correlations'])
+        self.assertTrue(correlations)
+        self.assertEqual(correlations, sorted(correlations, key=lambda row: -abs(row.correlation_coefficient)))
+        self.assertFalse([q for q in queries.captured_queries if q['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))])
+        self.assertFalse(Correlation.objects.exists())
+        
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/insights/?days=30')
+        self.assertFalse([q for q in queries.captured_queries if 'journal_metricprefix' in q['sql']])
+
+
+class InsightJobTests(QueryCountTestCase):
+    """Generation is queued per window and the worker's cost does not grow with entries."""
+    
+    def test_repeated_requests_share_one_job(self):
+        """Asking twice for the same window returns the queued job."""
+        self.create_entries(10)
+        first = self.client.post('/insights/api/generate/', {'days': 30})
+        second = self.client.post('/insights/api/generate/', {'days': 30})
+        other = self.client.post('/insights/api/generate/', {'days': 7})
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(first.json()['job']['id'], second.json()['job']['id'])
+        self.assertNotEqual(first.json()['job']['id'], other.json()['job']['id'])
+        self.assertFalse(Insight.objects.exists())
+    
+    def test_worker_runs_job_with_constant_queries(self):
+        """The worker completes queued jobs with a query count independent of the window's size."""
+        counts = []
+        for size in (10, 500):
+            JournalEntry.objects.all().delete()
+            self.create_entries(size)
+            job = InsightJob.enqueue(self.user, 365)
+            with CaptureQueriesContext(connection) as queries:
+                call_command('run_insight_jobs', '--once', stdout=StringIO())
+            # One INSERT per generated insight, however many entries fed it
+            counts.append(len([q for q in queries.captured_queries if 'INSERT INTO "insights_insight"' not in q['sql']]))
+            
+            response = self.client.get(f'/insights/api/jobs/{job.id}/')
+            self.assertEqual(response.json()['job']['status'], 'done')
+            self.assertGreater(response.json()['job']['insight_count'], 0)
+        self.assertEqual(counts[0], counts[1])
+    
+    def test_regenerating_a_window_replaces_its_insights(self):
+        """Running the same window again rewrites rows in place with one bulk write."""
+        self.create_entries(60)
+        for _ in range(3):
+            InsightJob.enqueue(self.user, 30)
+            with CaptureQueriesContext(connection) as queries:
+                call_command('run_insight_jobs', '--once', stdout=StringIO())
+            inserts = [q for q in queries.captured_queries if 'INSERT INTO "insights_insight"' in q['sql']]
+            self.assertEqual(len(inserts), 1)
+        
+        kinds = list(Insight.objects.filter(user=self.user, window_days=30).values_list('kind', flat=True))
+        self.assertEqual(len(kinds), len(set(kinds)))
+        self.assertEqual(self.client.get('/insights/?days=30').context['insights'].count(), len(kinds))
+    
+    def test_dropped_kinds_are_superseded_and_pruned(self):
+        """A kind missing from a new run is deactivated, then removed after retention."""
+        today = timezone.now().date()
+        stale = Insight.objects.create(user=self.user, kind='mood_trend', title='Positive Mood Trend', description='',
+                                       insight_type='trend', window_days=30, start_date=today, end_date=today)
+        Insight.supersede(self.user, 30, today, today, [
+            {'kind': 'mood_summary', 'title': 'Mood Summary', 'description': '', 'type': 'summary', 'data': {}},
+        ])
+        stale.refresh_from_db()
+        self.assertFalse(stale.is_active)
+        
+        self.assertEqual(Insight.prune_superseded(), 0)
+        Insight.objects.filter(id=stale.id).update(updated_at=timezone.now() - Insight.RETENTION - timedelta(days=1))
+        self.assertEqual(Insight.prune_superseded(batch_size=1), 1)
+        self.assertEqual(list(Insight.objects.values_list('kind', flat=True)), ['mood_summary'])
+
+
+def run_tests():
+    """Run all tests."""
+    from django.test.utils import get_runner
+    from django.conf import settings
+    
+    TestRunner = get_runner(settings)
+    test_runner = TestRunner()
+    failures = test_runner.run_tests(["__main__"])
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    run_tests()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+"""
+Query plan regression tests for the per-user time-range queries.
+Run with: python test_query_plans.py
+"""
+
+import os
+import sys
+import django
+from datetime import timedelta
+
+# Add the project directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Set up Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mental_health_journal.settings')
+django.setup()
+
+from django.test import TestCase
+from django.db import connection
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from journal.models import JournalEntry, DailySummary, ReminderLog
+from insights.models import Insight
+from reports.models import Report
+
+User = get_user_model()
+
+
+class QueryPlanTests(TestCase):
+    """The hot per-user queries must be served by an index, never a full table scan."""
+
+    users = 5
+    entries_per_user = 200
+
+    @classmethod
+    def setUpTestData(cls):
+        """Seed several users so a per-user filter is selective."""
+        today = timezone.now().date()
+        for n in range(cls.users):
+            user = User.objects.create_user(email=f'plan{n}@example.com', password='testpass123')
+            JournalEntry.objects.bulk_create([
+                JournalEntry(user=user, date=today - timedelta(days=i), mood_rating=i % 11)
+                for i in range(cls.entries_per_user)
+            ])
+            DailySummary.rebuild_for_user(user)
+            Insight.objects.bulk_create([
+                Insight(user=user, title='Insight', description='', insight_type='trend',
+                        start_date=today - timedelta(days=30), end_date=today)
+                for _ in range(20)
+            ])
+            Report.objects.bulk_create([
+                Report(user=user, title='Report', report_type='weekly',
+                       start_date=today - timedelta(days=7), end_date=today)
+                for _ in range(20)
+            ])
+            ReminderLog.objects.bulk_create([ReminderLog(user=user, reminder_type='daily') for _ in range(20)])
+        cls.user = User.objects.get(email='plan0@example.com')
+        cls.start_date = today - timedelta(days=30)
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def explain(self, queryset):
+        """Return the query plan, with sequential scans disabled where the planner allows it."""
+        if connection.vendor == 'postgresql':
+            # Small test tables make a seq scan cheapest; only fail if no index applies at all
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+    def assertUsesIndex(self, queryset):
+        """Fail unless the plan reads the queried table through an index lookup.
+        
+        A full scan of an index is as bad as a table scan here, so the index
+        must be searched with a condition, not just walked in order.
+        """
+        plan = self.explain(queryset)
+        table = queryset.model._meta.db_table
+        if connection.vendor == 'postgresql':
+            self.assertNotIn(f'Seq Scan on {table}', plan, plan)
+            self.assertIn('Index Cond', plan, plan)
+        elif connection.vendor == 'sqlite':
+            self.assertNotRegex(plan, rf'SCAN {table}\b', plan)
+            self.assertRegex(plan, rf'SEARCH {table} USING', plan)
+
+    def test_entry_date_range(self):
+        """Charts and the entries API read a date range in date order."""
+        self.assertUsesIndex(self.user.entries.filter(date__gte=self.start_date).order_by('date', 'id'))
+
+    def test_history_keyset_page(self):
+        """History pages walk (date, created_at, id) from a cursor."""
+        entry = self.user.entries.order_by('-date')[50]
+        self.assertUsesIndex(
+            self.user.entries.filter(date__lte=entry.date).order_by('-date', '-created_at', '-id')[:21]
+        )
+
+    def test_sync_watermark(self):
+        """Delta sync reads entries changed since a watermark."""
+        since = timezone.now() - timedelta(hours=1)
+        self.assertUsesIndex(
+            JournalEntry.objects.filter(user=self.user, updated_at__gte=since).order_by('updated_at', 'id')
+        )
+
+    def test_daily_summary_window(self):
+        """Dashboard and stats read the daily rollup for a window."""
+        self.assertUsesIndex(self.user.daily_summaries.filter(date__gte=self.start_date))
+
+    def test_active_insights(self):
+        """The insights page lists the current insights for its window."""
+        self.assertUsesIndex(self.user.insights.filter(window_days=30, is_active=True).order_by('-updated_at')[:10])
+
+    def test_superseded_insights(self):
+        """The retention job finds inactive insights past the cutoff across all users."""
+        self.assertUsesIndex(Insight.objects.filter(is_active=False, updated_at__lt=timezone.now()).order_by().values_list('id', flat=True)[:1000])
+
+    def test_recent_reports(self):
+        """The reports page lists the newest reports."""
+        self.assertUsesIndex(self.user.reports.order_by('-created_at')[:20])
+
+    def test_recent_reminders(self):
+        """Reminder analytics read the logs sent in a time range."""
+        since = timezone.now() - timedelta(days=7)
+        self.assertUsesIndex(self.user.reminder_logs.filter(sent_at__gte=since))
+
+
+def run_tests():
+    """Run all tests."""
+    from django.test.utils import get_runner
+    from django.conf import settings
+
+    TestRunner = get_runner(settings)
+    test_runner = TestRunner()
+    failures = test_runner.run_tests(["__main__"])
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    run_tests()